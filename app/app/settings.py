@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -46,6 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, to time the whole request, removed when METRICS_ENABLED is off
+    'core.middleware.MetricsMiddleware',
+    # Removed unless QUERY_DETECTOR_ENABLED is on
+    'core.middleware.QueryDetectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -90,6 +96,23 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Local memory by default, which is private to each process: writes only
+# invalidate cached tokens and responses of the process making them.
+# settings_production uses memcached, shared by all the workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -108,6 +131,34 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hashers of new passwords: argon2 when argon2-cffi is installed, else
+# bcrypt when bcrypt is, else PBKDF2. Passwords hashed by the others, or
+# with other parameters, are upgraded on the next successful login.
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER') or (
+    'argon2' if find_spec('argon2') is not None
+    else 'bcrypt' if find_spec('bcrypt') is not None
+    else 'pbkdf2'
+)
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items()
+    if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 19 * 1024  # KiB
+PASSWORD_ARGON2_PARALLELISM = 1  # threads per hash, workers use the cores
+PASSWORD_BCRYPT_ROUNDS = 12
+
+# Login attempts per client IP and per email, see user.throttling
+LOGIN_THROTTLE_RATES = {
+    'ip': os.environ.get('LOGIN_THROTTLE_IP_RATE', '60/min'),
+    'email': os.environ.get('LOGIN_THROTTLE_EMAIL_RATE', '10/min'),
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -132,6 +183,15 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Uploads larger than this are streamed to a temporary file in chunks
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+# Recipe images, see recipe.images
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # bytes
+RECIPE_IMAGE_RENDITION_WIDTHS = [320, 640, 1280]  # pixels
+RECIPE_IMAGE_WORKERS = 2  # background resizing threads per process
+RECIPE_IMAGE_RENDITIONS_ASYNC = True
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -139,10 +199,44 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'  # assign custom user model
 
+# JSON is encoded and decoded with orjson when it is installed (see
+# core.renderers), MessagePack is offered when msgpack is installed
+API_RENDERER_CLASSES = [
+    'core.renderers.FastJSONRenderer',
+    'rest_framework.renderers.BrowsableAPIRenderer',
+]
+API_PARSER_CLASSES = [
+    'core.renderers.FastJSONParser',
+    'rest_framework.parsers.FormParser',
+    'rest_framework.parsers.MultiPartParser',
+]
+if find_spec('msgpack') is not None:
+    API_RENDERER_CLASSES.append('core.renderers.MessagePackRenderer')
+    API_PARSER_CLASSES.append('core.renderers.MessagePackParser')
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': API_RENDERER_CLASSES,
+    'DEFAULT_PARSER_CLASSES': API_PARSER_CLASSES,
 }
 
+# Token -> user lookups cached by user.authentication.CachedTokenAuthentication
+TOKEN_AUTH_LOCAL_CACHE_SIZE = 1024  # entries kept in each process
+TOKEN_AUTH_LOCAL_CACHE_TTL = 30  # seconds
+TOKEN_AUTH_CACHE_TTL = 300  # seconds, in Django's cache
+
+# Rendered recipe/tag/ingredient lists, invalidated on writes
+RECIPE_RESPONSE_CACHE_TTL = 300  # seconds
+
+# Per view latency, query and size histograms served at /metrics
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+
+# Logging of N+1 and slow queries per request, see core.queries
+QUERY_DETECTOR_ENABLED = os.environ.get('QUERY_DETECTOR', '0') == '1'
+QUERY_DETECTOR_RAISE = False  # raise QueryPatternError instead of logging
+QUERY_DETECTOR_N_PLUS_ONE = 5  # runs of the same query shape per request
+QUERY_DETECTOR_SLOW_MS = 100  # queries slower than this are EXPLAINed
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Django settings for running the app in production.
+
+Everything not overridden here comes from app.settings. Select with
+DJANGO_SETTINGS_MODULE=app.settings_production, values are read from the
+environment (see docker-compose-deploy.yml).
+"""
+import os
+
+from app.settings import *  # noqa: F401,F403
+from app.settings import DATABASES, REST_FRAMEWORK
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
+
+
+# Database
+# Keep connections open across requests instead of reconnecting to
+# Postgres every time. Each worker thread holds its own connection, so
+# budget GUNICORN_WORKERS * GUNICORN_THREADS connections per container.
+
+DATABASES['default']['PORT'] = os.environ.get('DB_PORT', '5432')
+DATABASES['default']['CONN_MAX_AGE'] = int(
+    os.environ.get('DB_CONN_MAX_AGE', 600)
+)
+
+# Seconds between checks that a reused connection is still alive, so a
+# restarted database doesn't fail the first request of every thread
+DB_HEALTH_CHECK_INTERVAL = int(os.environ.get('DB_HEALTH_CHECK_INTERVAL', 30))
+
+# Behind pgbouncer in transaction pooling mode a server-side cursor can't
+# outlive its transaction, so fetch iterator() results client side
+if os.environ.get('DB_PGBOUNCER', '0') == '1':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+
+# Cache
+# Shared by every worker process, so a write invalidates cached tokens and
+# responses for all of them and login throttles count across workers
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.PyMemcacheCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION') or 'memcached:11211',
+    }
+}
+
+
+# Clients are identified by the address nginx appends to X-Forwarded-For,
+# the ones before it are set by the client. Count each proxy in front.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES') or 1),
+}
+
+
+# Security
+
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+CSRF_COOKIE_SECURE = True
+SESSION_COOKIE_SECURE = True
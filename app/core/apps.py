@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        import core.signals  # noqa: F401 connect the signal handlers
+
+        if getattr(settings, 'DB_HEALTH_CHECK_INTERVAL', None):
+            from core.db import check_connections
+            request_started.connect(check_connections)
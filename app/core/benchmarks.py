@@ -0,0 +1,180 @@
+"""
+Helpers for the benchmark management commands
+"""
+import itertools
+import statistics
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from core.counts import repair_recipe_counts
+from core.models import Recipe, Tag, Ingredient
+from core.search import refresh_search_vectors
+
+# Prefix of the emails of generated users
+SYNTHETIC_EMAIL_PREFIX = 'synthetic-'
+
+ADJECTIVES = [
+    'Spicy', 'Creamy', 'Roasted', 'Quick', 'Crispy', 'Smoky', 'Fresh',
+    'Slow cooked', 'Grilled', 'Lemony', 'Garlic', 'Sweet', 'Hearty',
+]
+DISHES = [
+    'chicken', 'pasta', 'soup', 'salad', 'curry', 'tacos', 'risotto',
+    'stew', 'pancakes', 'noodles', 'pie', 'burger', 'stir fry', 'tart',
+]
+
+
+def generate_recipes(rng, recipes, tags, tags_per_recipe):
+    """Create a user owning tagged recipes, return (user, tag ids).
+
+    Meant to run in a transaction that is rolled back afterwards.
+    """
+    user = get_user_model().objects.create_user(
+        email=f'benchmark-{uuid.uuid4().hex}@example.com',
+    )
+    tag_objects = Tag.objects.bulk_create([
+        Tag(user=user, name=f'Tag {i}', normalized_name=f'tag {i}')
+        for i in range(tags)
+    ])
+    recipe_objects = Recipe.objects.bulk_create([
+        Recipe(
+            user=user, title=f'Recipe {i}', description='',
+            time_minutes=10, price=5,
+        )
+        for i in range(recipes)
+    ], batch_size=1000)
+
+    through = Recipe.tags.through
+    per_recipe = min(tags_per_recipe, len(tag_objects))
+    through.objects.bulk_create([
+        through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipe_objects
+        for tag in rng.sample(tag_objects, per_recipe)
+    ], batch_size=5000)
+
+    _analyze(Recipe, Tag, through)
+    return user, [tag.id for tag in tag_objects]
+
+
+def _zipf_weights(count, skew):
+    """Weights of ranks 1..count, the first ones much more likely"""
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+def _pick(rng, objects, cum_weights, count):
+    """Return about count distinct objects drawn by popularity"""
+    return list(dict.fromkeys(
+        rng.choices(objects, cum_weights=cum_weights, k=count)
+    ))
+
+
+def _analyze(*models):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def generate_dataset(rng, users, recipes, tags, ingredients,
+                     tags_per_recipe, ingredients_per_recipe, skew=1.0):
+    """Create users owning recipes, tags and ingredients with bulk inserts.
+
+    Recipes are spread over users, and tags and ingredients over recipes,
+    following a Zipf distribution of exponent skew, so a few users and
+    items get most of them. recipes is the mean per user, tags and
+    ingredients are per user. Returns the ids of the users created.
+    """
+    run = uuid.uuid4().hex[:8]
+    user_objects = get_user_model().objects.bulk_create([
+        get_user_model()(
+            email=f'{SYNTHETIC_EMAIL_PREFIX}{run}-{i}@example.com',
+            name=f'User {i}',
+            password='!',  # unusable, the benchmarks use tokens
+        )
+        for i in range(users)
+    ], batch_size=1000)
+    recipes_per_user = Counter(rng.choices(
+        user_objects, cum_weights=_zipf_weights(users, skew),
+        k=users * recipes,
+    ))
+
+    links = {Tag: [], Ingredient: []}
+    recipe_objects = []
+    for user in user_objects:
+        items = {}
+        for model, count in [(Tag, tags), (Ingredient, ingredients)]:
+            items[model] = model.objects.bulk_create([
+                model(
+                    user=user,
+                    name=f'{model.__name__} {i}',
+                    normalized_name=f'{model.__name__.lower()} {i}',
+                )
+                for i in range(count)
+            ], batch_size=1000)
+
+        user_recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {i}',
+                description=(
+                    f'A {rng.choice(ADJECTIVES).lower()} take on '
+                    f'{rng.choice(DISHES)}.'
+                ),
+                time_minutes=rng.randint(5, 120),
+                price=Decimal(rng.randint(100, 5000)) / 100,
+            )
+            for i in range(recipes_per_user[user])
+        ], batch_size=1000)
+        recipe_objects += user_recipes
+
+        for model, per_recipe in [
+            (Tag, tags_per_recipe), (Ingredient, ingredients_per_recipe),
+        ]:
+            if not items[model] or not per_recipe:
+                continue
+            cum_weights = _zipf_weights(len(items[model]), skew)
+            links[model] += [
+                (recipe.id, item.id)
+                for recipe in user_recipes
+                for item in _pick(rng, items[model], cum_weights, per_recipe)
+            ]
+
+    for model, field_name in [(Tag, 'tags'), (Ingredient, 'ingredients')]:
+        through = getattr(Recipe, field_name).through
+        fk = f'{model._meta.model_name}_id'
+        through.objects.bulk_create([
+            through(recipe_id=recipe_id, **{fk: item_id})
+            for recipe_id, item_id in links[model]
+        ], batch_size=5000)
+        repair_recipe_counts(
+            model, model.objects.filter(user__in=user_objects),
+        )
+
+    recipe_ids = [recipe.id for recipe in recipe_objects]
+    for start in range(0, len(recipe_ids), 5000):
+        refresh_search_vectors(recipe_ids[start:start + 5000])
+
+    _analyze(
+        Recipe, Tag, Ingredient,
+        Recipe.tags.through, Recipe.ingredients.through,
+    )
+    return [user.id for user in user_objects]
+
+
+def time_calls(func, repeat):
+    """Call func repeat times, return (median, p95) in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95
@@ -0,0 +1,45 @@
+"""
+Maintenance of the denormalized recipe_count of tags and ingredients
+"""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Recipe, Tag, Ingredient
+
+# Recipe field linking recipes to each counted model
+RECIPE_FIELDS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+def link_fk(model):
+    """Return the through table of model's recipe links and its column"""
+    through = getattr(Recipe, RECIPE_FIELDS[model]).through
+    return through, f'{model._meta.model_name}_id'
+
+
+def recipe_count(model):
+    """Return the expression counting the recipes linked to model rows"""
+    through, fk = link_fk(model)
+    return Coalesce(Subquery(
+        through.objects.filter(**{fk: OuterRef('pk')})
+        .order_by()
+        .values(fk)
+        .annotate(count=Count('recipe_id'))
+        .values('count')
+    ), 0)
+
+
+def refresh_recipe_counts(model, ids):
+    """Recount the recipes of the given tags or ingredients in one query"""
+    if ids:
+        model.objects.filter(id__in=ids).update(
+            recipe_count=recipe_count(model)
+        )
+
+
+def repair_recipe_counts(model, queryset=None):
+    """Fix the counts that drifted, return the number of rows fixed"""
+    if queryset is None:
+        queryset = model.objects.all()
+    return queryset.exclude(recipe_count=recipe_count(model)).update(
+        recipe_count=recipe_count(model)
+    )
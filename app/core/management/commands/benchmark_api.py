@@ -0,0 +1,228 @@
+"""
+Django command to benchmark the API endpoints on the synthetic data.
+"""
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmarks import SYNTHETIC_EMAIL_PREFIX
+from core.middleware import QueryTimer
+from core.models import Recipe, Tag, Ingredient
+
+# Requests sent untimed to each endpoint first, filling the caches
+WARMUP_REQUESTS = 5
+# Requests traced for memory, which slows them down
+MEMORY_REQUESTS = 10
+
+
+def _git_revision():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def _endpoints(user, rng):
+    """Return {name: function returning the (path, params) of a request}"""
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)
+    )
+    top_tags = ','.join(str(pk) for pk in Tag.objects.filter(
+        user=user,
+    ).order_by('-recipe_count').values_list('id', flat=True)[:2])
+    recipes_url = reverse('recipe:recipe-list')
+    return {
+        'recipe-list': lambda: (recipes_url, {}),
+        'recipe-list-tags': lambda: (recipes_url, {'tags': top_tags}),
+        'recipe-search': lambda: (recipes_url, {'search': 'chicken'}),
+        'recipe-detail': lambda: (
+            reverse('recipe:recipe-detail', args=[rng.choice(recipe_ids)]),
+            {},
+        ),
+        'tag-list': lambda: (reverse('recipe:tag-list'), {'with_counts': 1}),
+        'ingredient-list': lambda: (reverse('recipe:ingredient-list'), {}),
+        'user-me': lambda: (reverse('user:me'), {}),
+    }
+
+
+def _percentile(values, percent):
+    return statistics.quantiles(values, n=100)[percent - 1] * 1000
+
+
+class Command(BaseCommand):
+    """Django command to time the API endpoints through the test client"""
+
+    help = (
+        'Send requests to the main endpoints as the synthetic user with '
+        'the most recipes, through the in-process test client, and report '
+        'throughput, latency percentiles, queries and memory per endpoint. '
+        'Run generate_data first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Timed requests per endpoint',
+        )
+        parser.add_argument(
+            '--endpoints',
+            help='Comma separated names of the endpoints to run',
+        )
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Allow responses to be served from the response cache',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='File to write the results to')
+        parser.add_argument(
+            '--compare', help='Results file of a previous run to compare to',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        user = get_user_model().objects.filter(
+            email__startswith=SYNTHETIC_EMAIL_PREFIX,
+        ).annotate(
+            recipes=Count('recipe'),
+        ).order_by('-recipes', 'id').first()
+        if user is None:
+            raise CommandError('No synthetic data, run generate_data first.')
+
+        endpoints = _endpoints(user, random.Random(options['seed']))
+        if options['endpoints']:
+            names = options['endpoints'].split(',')
+            unknown = set(names) - set(endpoints)
+            if unknown:
+                raise CommandError(
+                    f'Unknown endpoint(s): {", ".join(sorted(unknown))}. '
+                    f'Choose from {", ".join(endpoints)}.'
+                )
+            endpoints = {name: endpoints[name] for name in names}
+
+        token, _ = Token.objects.get_or_create(user=user)
+        host = (settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.')
+        client = APIClient(HTTP_HOST=host)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        counter = iter(range(10 ** 12))
+
+        def send(request):
+            path, params = request()
+            if not options['cached']:
+                # A distinct query string so no response is served from cache
+                params = {**params, '_': next(counter)}
+            response = client.get(path, params)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'GET {path} returned {response.status_code}'
+                )
+            return response
+
+        results = {
+            'meta': {
+                'revision': _git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'options': {
+                    key: options[key]
+                    for key in ['requests', 'cached', 'seed']
+                },
+                'dataset': {
+                    'user_recipes': user.recipes,
+                    'recipes': Recipe.objects.count(),
+                    'tags': Tag.objects.count(),
+                    'ingredients': Ingredient.objects.count(),
+                },
+            },
+            'endpoints': {},
+        }
+        for name, request in endpoints.items():
+            for _ in range(WARMUP_REQUESTS):
+                send(request)
+
+            latencies = []
+            queries = []
+            start = time.perf_counter()
+            for _ in range(options['requests']):
+                timer = QueryTimer()
+                request_start = time.perf_counter()
+                with connection.execute_wrapper(timer):
+                    send(request)
+                latencies.append(time.perf_counter() - request_start)
+                queries.append(timer.count)
+            elapsed = time.perf_counter() - start
+
+            peak = 0
+            tracemalloc.start()
+            try:
+                for _ in range(MEMORY_REQUESTS):
+                    tracemalloc.reset_peak()
+                    send(request)
+                    peak = max(peak, tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+
+            result = results['endpoints'][name] = {
+                'requests_per_second': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(_percentile(latencies, 50), 2),
+                'p95_ms': round(_percentile(latencies, 95), 2),
+                'p99_ms': round(_percentile(latencies, 99), 2),
+                'queries': round(statistics.mean(queries), 1),
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+            self.stdout.write(
+                f'{name:<18} {result["requests_per_second"]:8.1f} req/s  '
+                f'p50 {result["p50_ms"]:7.2f} ms  '
+                f'p95 {result["p95_ms"]:7.2f} ms  '
+                f'p99 {result["p99_ms"]:7.2f} ms  '
+                f'{result["queries"]:5.1f} queries  '
+                f'{result["peak_memory_kb"]:8.1f} KiB'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _compare(self, path, results):
+        """Print the change of each endpoint since a previous run"""
+        with open(path) as previous_file:
+            previous = json.load(previous_file)
+        self.stdout.write(
+            f'Compared to {previous["meta"].get("revision") or path}:'
+        )
+        for name, result in results['endpoints'].items():
+            before = previous['endpoints'].get(name)
+            if before is None:
+                self.stdout.write(f'{name:<18} not in the previous run')
+                continue
+            changes = '  '.join(
+                f'{key} {(result[key] - before[key]) / before[key]:+.1%}'
+                if before[key] else f'{key} {result[key] - before[key]:+}'
+                for key in [
+                    'requests_per_second', 'p50_ms', 'p99_ms', 'queries',
+                    'peak_memory_kb',
+                ]
+            )
+            self.stdout.write(f'{name:<18} {changes}')
@@ -0,0 +1,118 @@
+"""
+Django command to time logins through the token endpoint per hasher.
+"""
+import statistics
+import time
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.benchmarks import time_calls
+from core.middleware import QueryTimer
+
+# Modules the hashers need: argon2-cffi and bcrypt
+HASHER_LIBRARIES = {'argon2': 'argon2', 'bcrypt': 'bcrypt'}
+
+PASSWORD = 'benchmark-password'
+
+
+def _installed(name):
+    return name not in HASHER_LIBRARIES or (
+        find_spec(HASHER_LIBRARIES[name]) is not None
+    )
+
+
+class Command(BaseCommand):
+    """Django command to measure logins per second on one core"""
+
+    help = (
+        'Post credentials to the token endpoint with each password hasher '
+        'and report logins per second of this single process, latency '
+        'percentiles, the hash verification time and queries per login. '
+        'Throttling is disabled and everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument(
+            '--hashers',
+            help='Comma separated hashers, default the installed ones of '
+                 f'{", ".join(settings.PASSWORD_HASHER_CLASSES)}',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['hashers']:
+            names = options['hashers'].split(',')
+            unknown = set(names) - set(settings.PASSWORD_HASHER_CLASSES)
+            if unknown:
+                raise CommandError(
+                    f'Unknown hasher(s): {", ".join(sorted(unknown))}'
+                )
+            for name in names:
+                if not _installed(name):
+                    raise CommandError(
+                        f'The {name} hasher needs the {HASHER_LIBRARIES[name]}'
+                        ' module, which is not installed'
+                    )
+        else:
+            names = [
+                name for name in settings.PASSWORD_HASHER_CLASSES
+                if _installed(name)
+            ]
+
+        host = (settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.')
+        url = reverse('user:token')
+        for name in names:
+            hashers = [settings.PASSWORD_HASHER_CLASSES[name]] + [
+                path for path in settings.PASSWORD_HASHERS
+                if path != settings.PASSWORD_HASHER_CLASSES[name]
+            ]
+            with override_settings(
+                PASSWORD_HASHERS=hashers, LOGIN_THROTTLE_RATES={},
+            ), transaction.atomic():
+                self._run(name, url, host, options['requests'])
+                transaction.set_rollback(True)
+
+    def _run(self, name, url, host, requests):
+        user = get_user_model().objects.create_user(
+            email='benchmark-login@example.com', password=PASSWORD,
+        )
+        encoded = user.password
+        verify, _ = time_calls(
+            lambda: get_hasher().verify(PASSWORD, encoded), 5,
+        )
+
+        client = APIClient(HTTP_HOST=host)
+        payload = {'email': user.email, 'password': PASSWORD}
+        latencies = []
+        queries = []
+        start = time.perf_counter()
+        for _ in range(requests):
+            timer = QueryTimer()
+            request_start = time.perf_counter()
+            with connection.execute_wrapper(timer):
+                response = client.post(url, payload)
+            latencies.append(time.perf_counter() - request_start)
+            queries.append(timer.count)
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{name}: login returned {response.status_code}'
+                )
+        elapsed = time.perf_counter() - start
+
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{name:<8} {requests / elapsed:8.1f} logins/s  '
+            f'p50 {percentiles[49] * 1000:8.2f} ms  '
+            f'p99 {percentiles[98] * 1000:8.2f} ms  '
+            f'hash {verify:7.2f} ms  '
+            f'{statistics.mean(queries):4.1f} queries'
+        )
@@ -0,0 +1,85 @@
+"""
+Django command to time the recipe tag filters on generated data.
+"""
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.benchmarks import generate_recipes, time_calls
+from core.models import Recipe
+from recipe.filters import MATCH_ALL, MATCH_ANY, filter_by_related
+from recipe.pagination import RecipeCursorPagination
+
+
+def legacy_any(queryset, ids):
+    """The join then DISTINCT filter the recipe list used to run"""
+    return queryset.filter(tags__id__in=ids).distinct()
+
+
+def legacy_all(queryset, ids):
+    """Matching all tags by joining the links once per tag"""
+    for tag_id in ids:
+        queryset = queryset.filter(tags__id=tag_id)
+    return queryset.distinct()
+
+
+class Command(BaseCommand):
+    """Django command to compare the tag filter queries"""
+
+    help = (
+        'Time the recipe list tag filters on generated data. '
+        'Everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument(
+            '--filter-tags', type=int, default=3,
+            help='Number of tags filtered by.',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        self.stdout.write(
+            f'Generating {options["recipes"]} recipes and '
+            f'{options["tags"]} tags...'
+        )
+        with transaction.atomic():
+            user, tag_ids = generate_recipes(
+                random.Random(options['seed']),
+                options['recipes'],
+                options['tags'],
+                options['tags_per_recipe'],
+            )
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            ids = tag_ids[:options['filter_tags']]
+            variants = [
+                ('any, join + distinct', legacy_any(queryset, ids)),
+                ('any, exists', filter_by_related(
+                    queryset, 'tags', ids, MATCH_ANY,
+                )),
+                ('all, join per tag + distinct', legacy_all(queryset, ids)),
+                ('all, grouped count', filter_by_related(
+                    queryset, 'tags', ids, MATCH_ALL,
+                )),
+            ]
+            page_size = RecipeCursorPagination.page_size
+            for label, filtered in variants:
+                # Count the matches and fetch the first page
+                median, p95 = time_calls(
+                    lambda: (
+                        filtered.count(), list(filtered[:page_size + 1]),
+                    ),
+                    options['repeat'],
+                )
+                self.stdout.write(
+                    f'{label:<32} {filtered.count():>6} matches  '
+                    f'median {median:7.2f} ms  p95 {p95:7.2f} ms'
+                )
+
+            transaction.set_rollback(True)
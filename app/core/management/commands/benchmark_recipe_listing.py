@@ -0,0 +1,76 @@
+"""
+Django command to time rendering recipe lists with and without serializers.
+"""
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmarks import generate_recipes, time_calls
+from core.models import Recipe, Tag, Ingredient
+from recipe.listing import get_columns, get_row_plan, render_rows
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare the serializer and values() list paths"""
+
+    help = (
+        'Time fetching and rendering a page of recipes through the '
+        'serializers and through the values() fast path, per row. '
+        'Everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Recipes rendered per call.',
+        )
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rows = options['rows']
+        renderer = JSONRenderer()
+        with transaction.atomic():
+            user, _ = generate_recipes(
+                random.Random(options['seed']),
+                rows,
+                options['tags'],
+                options['tags_per_recipe'],
+            )
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            plan = get_row_plan(RecipeSerializer())
+
+            def serializers_path():
+                recipes = queryset.only(*get_columns(plan)).prefetch_related(
+                    Prefetch('tags', Tag.objects.only('id', 'name')),
+                    Prefetch('ingredients', Ingredient.objects.only(
+                        'id', 'name',
+                    )),
+                )
+                return renderer.render(
+                    RecipeSerializer(recipes, many=True).data
+                )
+
+            def values_path():
+                values = queryset.values('id', *get_columns(plan))
+                return renderer.render(render_rows(list(values), plan))
+
+            for label, func in [
+                ('serializers', serializers_path),
+                ('values() fast path', values_path),
+            ]:
+                median, p95 = time_calls(func, options['repeat'])
+                self.stdout.write(
+                    f'{label:<20} {median * 1000 / rows:8.1f} us/row  '
+                    f'(median {median:7.2f} ms, p95 {p95:7.2f} ms '
+                    f'for {rows} rows)'
+                )
+
+            transaction.set_rollback(True)
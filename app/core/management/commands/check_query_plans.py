@@ -0,0 +1,108 @@
+"""
+Django command to verify the hot API queries are served by indexes.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import search_recipes
+
+
+def hot_queries(user_id):
+    """Return (label, queryset) pairs for the queries every request runs"""
+    return [
+        (
+            'recipe list',
+            Recipe.objects.filter(user_id=user_id).order_by('-id'),
+        ),
+        (
+            'recipe search',
+            search_recipes(Recipe.objects.filter(user_id=user_id), 'name'),
+        ),
+        (
+            'tag list',
+            Tag.objects.filter(user_id=user_id).order_by('-name'),
+        ),
+        (
+            'tags by usage',
+            Tag.objects.filter(user_id=user_id).order_by(
+                '-recipe_count', '-id',
+            ),
+        ),
+        (
+            'tag lookup by name',
+            Tag.objects.filter(user_id=user_id, normalized_name='name'),
+        ),
+        (
+            'ingredient list',
+            Ingredient.objects.filter(user_id=user_id).order_by('-name'),
+        ),
+        (
+            'ingredients by usage',
+            Ingredient.objects.filter(user_id=user_id).order_by(
+                '-recipe_count', '-id',
+            ),
+        ),
+        (
+            'ingredient lookup by name',
+            Ingredient.objects.filter(user_id=user_id, normalized_name='name'),
+        ),
+        (
+            'recipes for tag',
+            Recipe.tags.through.objects.filter(tag_id=0).values('recipe_id'),
+        ),
+        (
+            'recipes for ingredient',
+            Recipe.ingredients.through.objects.filter(
+                ingredient_id=0
+            ).values('recipe_id'),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to EXPLAIN the hot queries and flag sequential scans"""
+
+    help = 'Check that the hot recipe API queries use index scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id', type=int, default=0,
+            help='User id to plan the queries for.',
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print the full plan of every query.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Query plans can only be checked on PostgreSQL.'
+            )
+
+        failed = []
+        with transaction.atomic():
+            # Tiny tables are cheaper to scan than to probe, so forbid
+            # sequential scans: a plan still using one has no usable index.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for label, queryset in hot_queries(options['user_id']):
+                plan = queryset.explain()
+                if options['verbose_plans']:
+                    self.stdout.write(plan)
+                if 'Seq Scan' in plan:
+                    failed.append(label)
+                    self.stdout.write(self.style.ERROR(f'Seq scan: {label}'))
+                else:
+                    self.stdout.write(f'Index scan: {label}')
+
+        if failed:
+            raise CommandError(
+                f'{len(failed)} hot queries do not use an index: '
+                + ', '.join(failed)
+            )
+
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes!'))
@@ -0,0 +1,62 @@
+"""
+Django command to generate synthetic data for the benchmarks.
+"""
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import SYNTHETIC_EMAIL_PREFIX, generate_dataset
+
+
+class Command(BaseCommand):
+    """Django command to fill the database with synthetic users"""
+
+    help = (
+        'Create users with recipes, tags and ingredients using bulk '
+        'inserts. Recipes per user and tags and ingredients per recipe '
+        'follow a Zipf distribution of exponent --skew. The data is kept '
+        'for benchmark_api, --clear deletes the previous synthetic users.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Mean number of recipes per user',
+        )
+        parser.add_argument(
+            '--tags', type=int, default=50, help='Tags per user',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=200,
+            help='Ingredients per user',
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--skew', type=float, default=1.0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--clear', action='store_true')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['clear']:
+            deleted, _ = get_user_model().objects.filter(
+                email__startswith=SYNTHETIC_EMAIL_PREFIX,
+            ).delete()
+            self.stdout.write(f'Deleted {deleted} synthetic rows')
+
+        user_ids = generate_dataset(
+            random.Random(options['seed']),
+            options['users'],
+            options['recipes'],
+            options['tags'],
+            options['ingredients'],
+            options['tags_per_recipe'],
+            options['ingredients_per_recipe'],
+            options['skew'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(user_ids)} users with about '
+            f'{len(user_ids) * options["recipes"]} recipes'
+        ))
@@ -0,0 +1,31 @@
+"""
+Django command to recompute the recipe counts of tags and ingredients.
+"""
+from django.core.management.base import BaseCommand
+
+from core.counts import RECIPE_FIELDS, repair_recipe_counts
+
+
+class Command(BaseCommand):
+    """Django command to fix drifted recipe_count columns"""
+
+    help = 'Recompute recipe_count of tags and ingredients in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id', type=int,
+            help='Only repair the counts of this user.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        for model in RECIPE_FIELDS:
+            queryset = model.objects.all()
+            if options['user_id'] is not None:
+                queryset = queryset.filter(user_id=options['user_id'])
+            fixed = repair_recipe_counts(model, queryset)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {fixed} fixed'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Recipe counts are up to date!'))
@@ -0,0 +1,122 @@
+"""
+In-process request metrics, exposed in the Prometheus text format
+
+Histograms are kept per process: with several gunicorn workers each scrape
+sees the worker that answered it, so scrape every worker or aggregate the
+series with the instance label.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    'app_http_request_duration_seconds': (
+        'Time handling the request, middleware included.', SECONDS_BUCKETS,
+    ),
+    'app_http_db_queries': (
+        'Database queries run by the request.', QUERIES_BUCKETS,
+    ),
+    'app_http_db_duration_seconds': (
+        'Time spent in database queries.', SECONDS_BUCKETS,
+    ),
+    'app_http_render_duration_seconds': (
+        'Time rendering the response data to bytes.', SECONDS_BUCKETS,
+    ),
+    'app_http_response_size_bytes': (
+        'Size of the response body, streaming responses excluded.',
+        BYTES_BUCKETS,
+    ),
+}
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Histograms of every metric, per (view, method)"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, values):
+        """Record {metric name: value} for the labels of a request"""
+        with self._lock:
+            for name, value in values.items():
+                key = (name, labels)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(
+                        HISTOGRAMS[name][1]
+                    )
+                histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """Return the histograms in the Prometheus text format"""
+        with self._lock:
+            snapshot = sorted(
+                (key, list(histogram.counts), histogram.sum)
+                for key, histogram in self._histograms.items()
+            )
+
+        lines = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (key_name, labels), counts, total in snapshot:
+                if key_name != name:
+                    continue
+                label_text = ','.join(
+                    f'{label}="{_escape(value)}"' for label, value in labels
+                )
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{{{label_text},le="{bound}"}} '
+                        f'{cumulative}'
+                    )
+                lines.append(f'{name}_sum{{{label_text}}} {total}')
+                lines.append(f'{name}_count{{{label_text}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n',
+    )
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    """Serve the collected metrics, 404 unless METRICS_ENABLED"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
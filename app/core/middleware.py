@@ -0,0 +1,97 @@
+"""
+Middleware for the API
+"""
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from core.metrics import registry
+from core.queries import QueryDetector
+
+
+class QueryTimer:
+    """execute_wrapper counting the queries run and the time they take"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """Record latency, queries, render time and size per view and method.
+
+    Removed from the chain when METRICS_ENABLED is off, so it costs
+    nothing then. Queries run while a streaming response is consumed are
+    not counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        request._metrics_render_duration = 0.0
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        values = {
+            'app_http_request_duration_seconds': duration,
+            'app_http_db_queries': queries.count,
+            'app_http_db_duration_seconds': queries.duration,
+            'app_http_render_duration_seconds': (
+                request._metrics_render_duration
+            ),
+        }
+        if not response.streaming:
+            values['app_http_response_size_bytes'] = len(response.content)
+        registry.observe((
+            ('view', match.view_name if match else '<unmatched>'),
+            ('method', request.method),
+        ), values)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the rendering that follows, e.g. DRF's JSON encoding"""
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render_duration = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class QueryDetectorMiddleware:
+    """Report the N+1 and slow queries of each request.
+
+    Logs to the core.queries logger, or raises when QUERY_DETECTOR_RAISE
+    is set, as in tests. Removed from the chain unless
+    QUERY_DETECTOR_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_DETECTOR_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        detector = QueryDetector()
+        with connection.execute_wrapper(detector):
+            response = self.get_response(request)
+        detector.report(f'{request.method} {request.path}')
+        return response
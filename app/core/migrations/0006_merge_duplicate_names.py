@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold tags/ingredients sharing a (user, name) into the oldest row"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in [('Tag', 'tags'), ('Ingredient', 'ingredients')]:
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field_name).through
+        fk = f'{model._meta.model_name}_id'
+        duplicates = (
+            model.objects.values('user', 'name')
+            .annotate(keep_id=Min('id'), total=Count('id'))
+            .filter(total__gt=1)
+        )
+        for row in duplicates:
+            drop_ids = list(
+                model.objects.filter(user=row['user'], name=row['name'])
+                .exclude(id=row['keep_id'])
+                .values_list('id', flat=True)
+            )
+            linked = through.objects.filter(
+                **{fk: row['keep_id']}
+            ).values('recipe_id')
+            # Repoint links the kept row lacks, the rest are duplicates
+            through.objects.filter(**{f'{fk}__in': drop_ids}).exclude(
+                recipe_id__in=linked
+            ).update(**{fk: row['keep_id']})
+            model.objects.filter(id__in=drop_ids).delete()
+
+
+# Apart from 0007_recipe_query_indexes, which adds the unique constraints:
+# Postgres can't ALTER tables with pending trigger events from these writes
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
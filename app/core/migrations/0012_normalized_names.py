@@ -0,0 +1,86 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def normalize_name(name):
+    return name.strip().casefold()
+
+
+def dedupe_names(apps, schema_editor):
+    """Fill normalized_name and merge the rows it makes duplicates.
+
+    The oldest row of each (user, normalized_name) is kept and the recipe
+    links of the others are moved to it in bulk, dropping the links the
+    recipe already has.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in [('Tag', 'tags'), ('Ingredient', 'ingredients')]:
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field_name).through
+        fk = f'{model._meta.model_name}_id'
+
+        objects = list(model.objects.only('id', 'user_id', 'name').order_by('id'))
+        kept = {}
+        merged = {}  # duplicate id: kept id
+        for obj in objects:
+            obj.normalized_name = normalize_name(obj.name)
+            kept_id = kept.setdefault((obj.user_id, obj.normalized_name), obj.id)
+            if kept_id != obj.id:
+                merged[obj.id] = kept_id
+        model.objects.bulk_update(objects, ['normalized_name'], batch_size=1000)
+        if not merged:
+            continue
+
+        linked = set(
+            through.objects.filter(**{f'{fk}__in': set(merged.values())})
+            .values_list('recipe_id', fk)
+        )
+        moved = []
+        dropped = []
+        for link in through.objects.filter(**{f'{fk}__in': merged}).order_by('id'):
+            pair = (link.recipe_id, merged[getattr(link, fk)])
+            if pair in linked:
+                dropped.append(link.id)
+            else:
+                linked.add(pair)
+                setattr(link, fk, pair[1])
+                moved.append(link)
+        through.objects.filter(id__in=dropped).delete()
+        through.objects.bulk_update(moved, [fk], batch_size=1000)
+        model.objects.filter(id__in=merged).delete()
+
+        model.objects.filter(id__in=set(merged.values())).update(
+            recipe_count=Coalesce(Subquery(
+                through.objects.filter(**{fk: OuterRef('pk')})
+                .order_by()
+                .values(fk)
+                .annotate(count=Count('recipe_id'))
+                .values('count')
+            ), 0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(dedupe_names, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,8 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -21,6 +23,21 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads', 'recipe', filename) # Create the path for different OS
 
 
+def normalize_name(name):
+    """Return the form of a tag or ingredient name compared for uniqueness"""
+    return name.strip().casefold()
+
+
+class NormalizedNameMixin:
+    """Keep normalized_name in sync with name when saving"""
+
+    def save(self, *args, update_fields=None, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        if update_fields is not None and 'name' in update_fields:
+            update_fields = {*update_fields, 'normalized_name'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
 class UserManager(BaseUserManager):
     """
     Manager for users
@@ -71,28 +88,96 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path) # funtion to generate the path
+    # Resized copies of image by format and width, see recipe.images
+    image_variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped when the recipe's tags or ingredients change (core.signals)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Title, description and tag/ingredient names, see core.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Recipe lists filter by user and page newest first
+            models.Index(
+                fields=['user', '-id'], name='core_recipe_user_id_desc',
+            ),
+            # Last-Modified of a user's recipe list
+            models.Index(
+                fields=['user', 'updated_at'], name='core_recipe_user_updated',
+            ),
+            GinIndex(fields=['search_vector'], name='core_recipe_search_gin'),
+        ]
 
     # when we listing things, it show the title, by default is id
     def __str__(self):
         return self.title
 
-class Tag(models.Model):
+
+class Tag(NormalizedNameMixin, models.Model):
     """Tag for filtering recipes"""
     name = models.CharField(max_length=255)
+    # Trimmed and casefolded name, "Salt" and "salt " are the same tag
+    normalized_name = models.CharField(max_length=255, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Recipes linked to it, maintained on write (see core.counts)
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            # Also the index for get-or-create lookups
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_tag_user_normalized_name_uniq',
+            ),
+        ]
+        indexes = [
+            # Listing by name
+            models.Index(fields=['user', 'name'], name='core_tag_user_name'),
+            # Most used first, ties newest first
+            models.Index(
+                fields=['user', '-recipe_count', '-id'],
+                name='core_tag_user_count',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
-class Ingredient(models.Model):
+
+class Ingredient(NormalizedNameMixin, models.Model):
     """Ingredient for recipes"""
     name = models.CharField(max_length=255)
+    # Trimmed and casefolded name, "Salt" and "salt " are the same ingredient
+    normalized_name = models.CharField(max_length=255, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Recipes linked to it, maintained on write (see core.counts)
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_ingredient_user_normalized_name_uniq',
+            ),
+        ]
+        indexes = [
+            # Listing by name
+            models.Index(
+                fields=['user', 'name'], name='core_ingredient_user_name',
+            ),
+            # Most used first, ties newest first
+            models.Index(
+                fields=['user', '-recipe_count', '-id'],
+                name='core_ingredient_user_count',
+            ),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
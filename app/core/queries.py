@@ -0,0 +1,155 @@
+"""
+Detection of N+1 query patterns and slow queries
+
+QueryDetector is a connection.execute_wrapper grouping the queries it sees
+by fingerprint, their SQL with the literal values taken out. A fingerprint
+repeated n_plus_one times is reported with the stack that ran it, queries
+slower than slow_ms are reported with their EXPLAIN plan.
+"""
+import logging
+import os
+import re
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.test import override_settings
+
+logger = logging.getLogger(__name__)
+
+# Statements Django issues around atomic blocks, repeated by design
+IGNORED_PREFIXES = ('savepoint', 'release savepoint', 'rollback to savepoint')
+
+_FINGERPRINT_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+# Only frames of the project are shown in the reported stacks
+_PROJECT_DIR = str(settings.BASE_DIR)
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class QueryPatternError(AssertionError):
+    """Raised for N+1 queries when the detector is set to raise"""
+
+
+def fingerprint(sql):
+    """Return sql with literals and value lists replaced by placeholders"""
+    for pattern, replacement in _FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip().lower()
+
+
+def _project_stack():
+    return ''.join(traceback.format_list([
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(_PROJECT_DIR)
+        and os.path.abspath(frame.filename) != _THIS_FILE
+    ][-8:]))
+
+
+class QueryDetector:
+    """execute_wrapper collecting repeated and slow queries"""
+
+    def __init__(self, n_plus_one=None, slow_ms=None, raise_errors=None):
+        if n_plus_one is None:
+            n_plus_one = settings.QUERY_DETECTOR_N_PLUS_ONE
+        if slow_ms is None:
+            slow_ms = settings.QUERY_DETECTOR_SLOW_MS
+        if raise_errors is None:
+            raise_errors = settings.QUERY_DETECTOR_RAISE
+        self.n_plus_one = n_plus_one
+        self.slow_ms = slow_ms
+        self.raise_errors = raise_errors
+        self.counts = {}
+        self.stacks = {}  # fingerprint: stack of its n_plus_one-th run
+        self.slow = []  # (duration in ms, sql, params)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            key = fingerprint(sql)
+            if not key.startswith(IGNORED_PREFIXES):
+                count = self.counts[key] = self.counts.get(key, 0) + 1
+                if count == self.n_plus_one:
+                    self.stacks[key] = _project_stack()
+            if duration >= self.slow_ms and not many:
+                self.slow.append((duration, sql, params))
+
+    def get_repeated(self):
+        """Return [(fingerprint, count, stack)] of the N+1 patterns seen"""
+        return [
+            (key, self.counts[key], stack)
+            for key, stack in self.stacks.items()
+        ]
+
+    def report(self, label=''):
+        """Log what was detected, raise QueryPatternError if configured to"""
+        prefix = f'{label}: ' if label else ''
+        for duration, sql, params in self.slow:
+            logger.warning(
+                '%sslow query (%.1f ms): %s\n%s',
+                prefix, duration, sql, _explain(sql, params),
+            )
+
+        messages = [
+            f'{prefix}N+1 query, run {count} times: {key}\n{stack}'
+            for key, count, stack in self.get_repeated()
+        ]
+        for message in messages:
+            logger.warning(message)
+        if messages and self.raise_errors:
+            raise QueryPatternError('\n'.join(messages))
+
+
+def _explain(sql, params):
+    """Return the plan of a SELECT, or an empty string"""
+    if not sql.lstrip().lower().startswith('select'):
+        return ''
+    try:
+        # A savepoint, so a failure doesn't abort the request's transaction
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql}', params,
+            )
+            return '\n'.join(str(row[0]) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f'(no plan: {exc})'
+
+
+@contextmanager
+def detect_queries(label='', **options):
+    """Run the block under a QueryDetector and report it on exit"""
+    detector = QueryDetector(**options)
+    with connection.execute_wrapper(detector):
+        yield detector
+    detector.report(label)
+
+
+class QueryDetectorTestMixin:
+    """Fail the test when a request of the test client runs N+1 queries.
+
+    Enables QueryDetectorMiddleware in raise mode. Objects created by the
+    test itself, outside requests, are not checked.
+    """
+    query_detector_settings = {
+        'QUERY_DETECTOR_ENABLED': True,
+        'QUERY_DETECTOR_RAISE': True,
+        'QUERY_DETECTOR_N_PLUS_ONE': 2,
+    }
+
+    def setUp(self):
+        override = override_settings(**self.query_detector_settings)
+        override.enable()
+        self.addCleanup(override.disable)
+        super().setUp()
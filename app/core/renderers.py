@@ -0,0 +1,103 @@
+"""
+Fast JSON and optional MessagePack renderers and parsers for the API.
+
+orjson is used when installed, with DRF's encoder handling every type it
+doesn't (dates, times, decimals, lazy strings...) so the output matches
+DRF's JSONRenderer. Without orjson the stdlib json module is used.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    # Let DRF's encoder format dates like JSONRenderer does, and
+    # stringify non-str keys like json.dumps
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when possible"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # orjson only writes compact, unescaped UTF-8
+        if (
+            orjson is None or data is None
+            or not self.compact or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+
+        try:
+            ret = orjson.dumps(
+                data, default=_encoder.default, option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers over 64 bits, which json.dumps supports
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+
+        # Keep the output a strict javascript subset, like JSONRenderer
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028',
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding with orjson when possible"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # orjson only reads UTF-8 and always rejects NaN and Infinity
+        if orjson is None or not self.strict or (
+            encoding.lower().replace('-', '') != 'utf8'
+        ):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer for MessagePack, needs the msgpack package"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(
+            data, default=_encoder.default, use_bin_type=True,
+        )
+
+
+class MessagePackParser(BaseParser):
+    """Parser for MessagePack request bodies, needs the msgpack package"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
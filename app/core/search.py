@@ -0,0 +1,83 @@
+"""
+Full-text search over recipes
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast
+
+from core.models import Recipe, Tag, Ingredient
+
+# Text search configuration of the stored vectors and of queries
+SEARCH_CONFIG = 'english'
+
+
+def is_supported():
+    """Return whether the database supports full-text search"""
+    return connection.vendor == 'postgresql'
+
+
+def _names(model):
+    """Subquery of a recipe's tag or ingredient names as one string"""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def search_vector():
+    """Return the expression computing a recipe's search_vector.
+
+    Title matches weigh the most, then description, then the names of
+    the recipe's tags and ingredients.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(_names(Tag), weight='C', config=SEARCH_CONFIG)
+        + SearchVector(_names(Ingredient), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(recipe_ids):
+    """Recompute the search_vector of recipes in one query"""
+    if recipe_ids and is_supported():
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            search_vector=search_vector()
+        )
+
+
+def search_recipes(queryset, text):
+    """Filter queryset to recipes matching text, annotated with a rank.
+
+    Without PostgreSQL, fall back to case-insensitive substring matching
+    of each word (no stemming, no rank annotation).
+    """
+    if not is_supported():
+        # Every word must match one of the fields, as in the websearch query
+        for word in text.split():
+            queryset = queryset.filter(
+                Q(title__icontains=word)
+                | Q(description__icontains=word)
+                | Q(Exists(Tag.objects.filter(
+                    recipe=OuterRef('pk'), name__icontains=word,
+                )))
+                | Q(Exists(Ingredient.objects.filter(
+                    recipe=OuterRef('pk'), name__icontains=word,
+                )))
+            )
+        return queryset
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    # Double precision so cursor positions round trip exactly
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+    )
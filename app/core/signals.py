@@ -0,0 +1,130 @@
+"""
+Signal handlers keeping denormalized recipe columns up to date
+"""
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import search
+from core.counts import RECIPE_FIELDS, link_fk, refresh_recipe_counts
+from core.models import Recipe, Tag, Ingredient
+
+# Fields the search_vector is computed from
+SEARCHED_FIELDS = {'title', 'description'}
+
+
+def _touched_values():
+    """Column updates for recipes whose tags or ingredients changed"""
+    values = {'updated_at': timezone.now()}
+    if search.is_supported():
+        values['search_vector'] = search.search_vector()
+    return values
+
+
+def touch_recipes(recipe_ids):
+    """Mark recipes as modified without loading or saving them"""
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(**_touched_values())
+
+
+@receiver(post_save, sender=Recipe)
+def index_on_save(sender, instance, update_fields=None, **kwargs):
+    """Recompute the search_vector of a saved recipe"""
+    if update_fields is None or SEARCHED_FIELDS & set(update_fields):
+        search.refresh_search_vectors([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_on_link_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count a change of tags or ingredients as a change of the recipe"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.updated_at = timezone.now()
+            touch_recipes([instance.id])
+        return
+
+    # instance is a tag or ingredient and pk_set holds recipe ids
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        touch_recipes(instance.__dict__.pop('_cleared_recipe_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(pk_set)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_on_link_change(sender, instance, action, reverse, model, pk_set,
+                         **kwargs):
+    """Recount the recipes of tags or ingredients linked or unlinked"""
+    if reverse:
+        # instance is the tag or ingredient itself
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_recipe_counts(type(instance), [instance.id])
+        return
+
+    # instance is a recipe and pk_set holds tag or ingredient ids
+    if action == 'pre_clear':
+        setattr(instance, f'_cleared_{model._meta.model_name}_ids', list(
+            getattr(instance, RECIPE_FIELDS[model]).values_list(
+                'id', flat=True,
+            )
+        ))
+    elif action == 'post_clear':
+        refresh_recipe_counts(model, instance.__dict__.pop(
+            f'_cleared_{model._meta.model_name}_ids', [],
+        ))
+    elif action in ('post_add', 'post_remove'):
+        refresh_recipe_counts(model, pk_set)
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_links_on_delete(sender, instance, **kwargs):
+    """Remember the tags and ingredients of a recipe about to be deleted"""
+    # The links are deleted by the cascade, which sends no m2m_changed
+    instance._linked_ids = {}
+    for model in RECIPE_FIELDS:
+        through, fk = link_fk(model)
+        instance._linked_ids[model] = list(
+            through.objects.filter(recipe_id=instance.id)
+            .values_list(fk, flat=True)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def count_on_delete(sender, instance, **kwargs):
+    """Recount the tags and ingredients of a deleted recipe"""
+    for model, ids in instance.__dict__.pop('_linked_ids', {}).items():
+        refresh_recipe_counts(model, ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_on_name_change(sender, instance, created, **kwargs):
+    """Recipes render tag and ingredient names, so renames modify them"""
+    if not created:
+        instance.recipe_set.update(**_touched_values())
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_on_delete(sender, instance, **kwargs):
+    """Remember the recipes of a tag or ingredient about to be deleted"""
+    instance._deleted_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def touch_on_delete(sender, instance, **kwargs):
+    """Refresh the recipes that lost a tag or ingredient"""
+    touch_recipes(instance.__dict__.pop('_deleted_recipe_ids', []))
@@ -1,14 +1,25 @@
 """
 Test Django management commands
 """
-
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import patch  # mock the behavior
 
 from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command  # call the command by the name
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase  # testing the database availability
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.counts import recipe_count
+from core.models import Recipe, Tag, Ingredient
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -31,3 +42,150 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'EXPLAIN checks need PostgreSQL',
+)
+class QueryPlanCommandTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        """ Test every hot query is planned with an index scan """
+        out = StringIO()
+
+        call_command('check_query_plans', stdout=out)
+
+        self.assertNotIn('Seq scan', out.getvalue())
+        self.assertIn('All hot queries use indexes!', out.getvalue())
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_benchmark_recipe_filters(self):
+        """ Test the filter benchmark reports each variant and cleans up """
+        out = StringIO()
+
+        call_command(
+            'benchmark_recipe_filters', recipes=20, tags=5, repeat=1,
+            stdout=out,
+        )
+
+        self.assertIn('any, exists', out.getvalue())
+        self.assertIn('all, grouped count', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_recipe_listing(self):
+        """ Test the listing benchmark reports both paths per row """
+        out = StringIO()
+
+        call_command(
+            'benchmark_recipe_listing', rows=10, tags=5, repeat=1,
+            stdout=out,
+        )
+
+        self.assertIn('serializers', out.getvalue())
+        self.assertIn('values() fast path', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+
+class SyntheticDataCommandTests(TestCase):
+
+    def generate(self, **options):
+        call_command(
+            'generate_data', users=3, recipes=4, tags=5, ingredients=6,
+            tags_per_recipe=2, ingredients_per_recipe=3, stdout=StringIO(),
+            **options,
+        )
+
+    def test_generate_data(self):
+        """ Test users get recipes linked to their tags and ingredients """
+        self.generate()
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(Tag.objects.count(), 15)
+        self.assertEqual(Ingredient.objects.count(), 18)
+        for recipe in Recipe.objects.all():
+            self.assertIn(recipe.tags.count(), [1, 2])
+            self.assertTrue(recipe.ingredients.exists())
+            self.assertEqual(
+                set(recipe.tags.values_list('user', flat=True)),
+                {recipe.user_id},
+            )
+        self.assertFalse(Tag.objects.exclude(
+            recipe_count=recipe_count(Tag),
+        ).exists())
+
+    def test_generate_data_clear(self):
+        """ Test --clear deletes the previous synthetic users only """
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'test123',
+        )
+        self.generate()
+
+        self.generate(clear=True)
+
+        self.assertEqual(get_user_model().objects.count(), 4)
+        self.assertTrue(get_user_model().objects.filter(id=user.id).exists())
+        self.assertEqual(Recipe.objects.count(), 12)
+
+    def test_benchmark_api(self):
+        """ Test the API benchmark reports every endpoint and saves JSON """
+        self.generate()
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        out = StringIO()
+
+        call_command(
+            'benchmark_api', requests=3, output=output, stdout=out,
+        )
+        call_command(
+            'benchmark_api', requests=3, endpoints='recipe-list',
+            compare=output, stdout=out,
+        )
+
+        with open(output) as results_file:
+            results = json.load(results_file)
+        self.assertEqual(results['meta']['dataset']['recipes'], 12)
+        self.assertEqual(set(results['endpoints']), {
+            'recipe-list', 'recipe-list-tags', 'recipe-search',
+            'recipe-detail', 'tag-list', 'ingredient-list', 'user-me',
+        })
+        for result in results['endpoints'].values():
+            self.assertGreater(result['requests_per_second'], 0)
+            self.assertGreater(result['peak_memory_kb'], 0)
+        self.assertIn('Compared to', out.getvalue())
+        self.assertIn('recipe-list        requests_per_second', out.getvalue())
+
+    def test_benchmark_api_without_data(self):
+        """ Test the API benchmark asks for synthetic data first """
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', stdout=StringIO())
+
+    def test_benchmark_logins(self):
+        """ Test the login benchmark reports each hasher and cleans up """
+        out = StringIO()
+
+        call_command(
+            'benchmark_logins', requests=2, hashers='pbkdf2', stdout=out,
+        )
+
+        self.assertIn('pbkdf2', out.getvalue())
+        self.assertIn('logins/s', out.getvalue())
+        self.assertIn('2.0 queries', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class RepairCountsCommandTests(TestCase):
+
+    def test_repair_recipe_counts(self):
+        """ Test the command fixes drifted recipe counts """
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'test123',
+        )
+        Tag.objects.create(user=user, name='Vegan', recipe_count=3)
+        out = StringIO()
+
+        call_command('repair_recipe_counts', stdout=out)
+
+        self.assertIn('tags: 1 fixed', out.getvalue())
+        self.assertEqual(Tag.objects.get().recipe_count, 0)
@@ -0,0 +1,100 @@
+"""
+Tests for the recipe counts of tags and ingredients
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.counts import repair_recipe_counts
+from core.models import Recipe, Tag, Ingredient
+
+
+class RecipeCountTests(TestCase):
+    """Test recipe_count follows every way recipes get linked"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'test123',
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Tofu',
+        )
+
+    def _create_recipe(self):
+        return Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('5.00'),
+        )
+
+    def _assert_counts(self, tag_count, ingredient_count):
+        self.tag.refresh_from_db()
+        self.ingredient.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, tag_count)
+        self.assertEqual(self.ingredient.recipe_count, ingredient_count)
+
+    def test_add_and_remove(self):
+        """Test linking and unlinking from the recipe side"""
+        recipe = self._create_recipe()
+        recipe.tags.add(self.tag)
+        recipe.ingredients.add(self.ingredient)
+        self._create_recipe().tags.add(self.tag)
+        self._assert_counts(2, 1)
+
+        recipe.tags.remove(self.tag)
+        self._assert_counts(1, 1)
+
+    def test_clear_and_set(self):
+        """Test clear() and set() on a recipe"""
+        recipe = self._create_recipe()
+        recipe.tags.set([self.tag])
+        self._assert_counts(1, 0)
+
+        recipe.tags.clear()
+        self._assert_counts(0, 0)
+
+    def test_reverse_changes(self):
+        """Test linking from the tag side"""
+        recipe1 = self._create_recipe()
+        recipe2 = self._create_recipe()
+        self.tag.recipe_set.add(recipe1, recipe2)
+        self._assert_counts(2, 0)
+
+        self.tag.recipe_set.clear()
+        self._assert_counts(0, 0)
+
+    def test_recipe_delete(self):
+        """Test deleting recipes lowers the counts"""
+        for _ in range(3):
+            recipe = self._create_recipe()
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+        recipe.delete()
+        self._assert_counts(2, 2)
+
+        Recipe.objects.all().delete()
+        self._assert_counts(0, 0)
+
+    def test_save_keeps_count(self):
+        """Test saving a stale instance does not overwrite the count"""
+        stale = Tag.objects.get(id=self.tag.id)
+        self._create_recipe().tags.add(self.tag)
+
+        stale.name = 'Vegetarian'
+        stale.save(update_fields=['name'])
+
+        self._assert_counts(1, 0)
+
+    def test_repair(self):
+        """Test drifted counts are repaired"""
+        self._create_recipe().tags.add(self.tag)
+        Tag.objects.update(recipe_count=5)
+
+        fixed = repair_recipe_counts(Tag)
+
+        self.assertEqual(fixed, 1)
+        self._assert_counts(1, 0)
@@ -0,0 +1,37 @@
+"""
+Tests for the persistent connection health checks
+"""
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from core.db import check_connections
+
+
+@override_settings(DB_HEALTH_CHECK_INTERVAL=30)
+class CheckConnectionsTests(SimpleTestCase):
+    """Test broken persistent connections are closed"""
+    databases = {'default'}
+
+    def setUp(self):
+        connection.ensure_connection()
+        connection.health_checked = None
+
+    def test_unusable_connection_closed(self):
+        """Test a connection failing the ping is closed"""
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            check_connections()
+
+        close.assert_called_once()
+
+    def test_checked_once_per_interval(self):
+        """Test a connection is not pinged again within the interval"""
+        with patch.object(
+            connection, 'is_usable', return_value=True,
+        ) as is_usable:
+            check_connections()
+            check_connections()
+
+        self.assertEqual(is_usable.call_count, 1)
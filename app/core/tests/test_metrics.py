@@ -0,0 +1,107 @@
+"""
+Tests for the request metrics
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.metrics import Histogram, Registry, registry
+from core.models import Recipe
+
+METRICS_URL = reverse('metrics')
+
+
+def sample(text, line_start):
+    """Return the value of the line of a metrics page starting with it"""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'{line_start} not found in:\n{text}')
+
+
+class HistogramTests(TestCase):
+
+    def test_buckets(self):
+        """ Test values are counted in the first bucket holding them """
+        histogram = Histogram((1, 5))
+        for value in [0, 1, 2, 5, 6]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 2, 1])
+        self.assertEqual(histogram.sum, 14)
+
+    def test_render_cumulative(self):
+        """ Test the text format lists cumulative buckets per labels """
+        metrics = Registry()
+        labels = (('view', 'a"b'), ('method', 'GET'))
+        for count in [0, 3, 300]:
+            metrics.observe(labels, {'app_http_db_queries': count})
+
+        text = metrics.render()
+
+        self.assertIn('# TYPE app_http_db_queries histogram', text)
+        prefix = 'app_http_db_queries_bucket{view="a\\"b",method="GET",'
+        self.assertEqual(sample(text, prefix + 'le="0"}'), 1)
+        self.assertEqual(sample(text, prefix + 'le="3"}'), 2)
+        self.assertEqual(sample(text, prefix + 'le="+Inf"}'), 3)
+        self.assertEqual(sample(
+            text, 'app_http_db_queries_sum{view="a\\"b",method="GET"}',
+        ), 303)
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.50'),
+        )
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_records_per_view(self):
+        """ Test requests are recorded under their view name and method """
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(reverse('recipe:recipe-list'))
+        client.get(reverse('recipe:recipe-list'))
+
+        res = client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        text = res.content.decode()
+        labels = '{view="recipe:recipe-list",method="GET"}'
+        self.assertEqual(
+            sample(text, 'app_http_request_duration_seconds_count' + labels),
+            2,
+        )
+        self.assertGreater(sample(text, 'app_http_db_queries_sum' + labels), 0)
+        self.assertGreater(
+            sample(text, 'app_http_db_duration_seconds_sum' + labels), 0,
+        )
+        self.assertGreater(
+            sample(text, 'app_http_render_duration_seconds_sum' + labels), 0,
+        )
+        self.assertGreater(
+            sample(text, 'app_http_response_size_bytes_sum' + labels), 0,
+        )
+
+    def test_disabled(self):
+        """ Test nothing is recorded or served when disabled """
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(reverse('recipe:recipe-list'))
+
+        res = client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertNotIn('recipe-list', registry.render())
@@ -3,6 +3,7 @@ Tests for models
 """
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -75,6 +76,20 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_names_unique_when_normalized(self):
+        """Test tag names differing in case or spaces are the same tag"""
+        user = create_user()
+        tag = models.Tag.objects.create(user=user, name=' Salt')
+        self.assertEqual(tag.normalized_name, 'salt')
+
+        tag.name = 'Sea Salt'
+        tag.save(update_fields=['name'])
+        tag.refresh_from_db()
+        self.assertEqual(tag.normalized_name, 'sea salt')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='SEA SALT ')
+
     def test_create_ingredients(self):
         """Test creating an ingredient is successful"""
         user = create_user()
@@ -85,6 +100,25 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_recipe_link_change_updates_timestamp(self):
+        """Test adding a tag to a recipe counts as modifying it"""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('5.00'),
+            description='Sample description',
+        )
+        created = recipe.updated_at
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+
+        tag.recipe_set.add(recipe)
+
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, created)
+        self.assertEqual(recipe.created_at.date(), created.date())
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """ Test generation iamge path. """
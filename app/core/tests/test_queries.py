@@ -0,0 +1,115 @@
+"""
+Tests for the N+1 and slow query detector
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.queries import (
+    QueryDetectorTestMixin,
+    QueryPatternError,
+    detect_queries,
+    fingerprint,
+)
+from recipe.views import RecipeViewSet
+
+
+def create_user():
+    return get_user_model().objects.create_user(
+        email='user@example.com', password='test123',
+    )
+
+
+class DetectQueriesTests(TestCase):
+
+    def test_fingerprint(self):
+        """ Test literals and value lists are replaced by placeholders """
+        self.assertEqual(
+            fingerprint(
+                'SELECT "a"."id"  FROM "a" WHERE "a"."id" IN (1, 2, %s) '
+                "AND \"a\".\"name\" = 'x''y' LIMIT 21"
+            ),
+            'select "a"."id" from "a" where "a"."id" in (...) '
+            'and "a"."name" = ? limit ?',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "a" VALUES (%s, %s), (%s, %s)'),
+            fingerprint('INSERT INTO "a" VALUES (%s, %s)'),
+        )
+
+    def test_repeated_queries_raise(self):
+        """ Test the same query shape run repeatedly is an N+1 """
+        user = create_user()
+
+        with self.assertRaises(QueryPatternError) as context:
+            with detect_queries(n_plus_one=3, raise_errors=True):
+                for name in ['a', 'b', 'c']:
+                    list(Tag.objects.filter(user=user, name=name))
+
+        # The stack points at the code running the queries
+        self.assertIn('N+1 query, run 3 times', str(context.exception))
+        self.assertIn('test_queries.py', str(context.exception))
+
+    def test_different_queries_pass(self):
+        """ Test distinct queries and repeats under the limit are fine """
+        user = create_user()
+
+        with detect_queries(n_plus_one=3, raise_errors=True) as detector:
+            list(Tag.objects.filter(user=user))
+            list(Tag.objects.filter(user=user))
+            list(Recipe.objects.filter(user=user))
+
+        self.assertEqual(detector.get_repeated(), [])
+
+    def test_slow_queries_logged_with_plan(self):
+        """ Test queries over the threshold are logged with EXPLAIN """
+        user = create_user()
+
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            with detect_queries(slow_ms=0):
+                list(Tag.objects.filter(user=user))
+
+        self.assertIn('slow query', logs.output[0])
+        self.assertIn('core_tag', logs.output[0])
+        self.assertIn('Scan', logs.output[0])
+
+
+class QueryDetectorMiddlewareTests(QueryDetectorTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for title in ['Soup', 'Salad']:
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5,
+                price=Decimal('2.50'),
+            )
+            recipe.tags.add(Tag.objects.create(user=self.user, name=title))
+
+    def test_n_plus_one_request_fails(self):
+        """ Test a request querying once per recipe raises in tests """
+        # Serialize the models without prefetching their tags
+        columns = ['id', 'title', 'time_minutes', 'price', 'link']
+        with patch.object(RecipeViewSet, 'values_list_enabled', False), \
+                patch.object(
+                    RecipeViewSet, '_get_read_plan',
+                    return_value=(columns, []),
+                ):
+            with self.assertRaises(QueryPatternError):
+                self.client.get(reverse('recipe:recipe-list'))
+
+    def test_prefetched_request_passes(self):
+        """ Test the regular list runs no N+1 """
+        with patch.object(RecipeViewSet, 'values_list_enabled', False):
+            res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,150 @@
+"""
+Tests for the fast JSON and MessagePack renderers and parsers
+"""
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Recipe
+
+SAMPLE = OrderedDict([
+    ('id', 1),
+    ('price', '5.00'),
+    ('raw_price', Decimal('5.50')),
+    ('image', 'http://testserver/static/media/uploads/recipe/a.jpg'),
+    ('title', 'Crème brûlée \u2028\u2029 "quoted" \\ </script>'),
+    ('created', datetime.datetime(2024, 5, 1, 12, 30, 15, 123456,
+                                  tzinfo=datetime.timezone.utc)),
+    ('local', datetime.datetime(2024, 5, 1, 12, 30)),
+    ('day', datetime.date(2024, 5, 1)),
+    ('time', datetime.time(8, 15)),
+    ('duration', datetime.timedelta(minutes=90)),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('lazy', gettext_lazy('This field is required.')),
+    ('variants', {'webp': {320: 'a_320w.webp'}}),
+    ('tags', [{'id': 2, 'name': 'Vegan'}, {'id': 3, 'name': 'Spicy'}]),
+    ('empty', None),
+    ('flags', [True, False]),
+])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the fast renderer writes what JSONRenderer writes"""
+
+    def test_same_output(self):
+        """Test the output is byte-identical to JSONRenderer"""
+        for data in [SAMPLE, SAMPLE['tags'], {'results': []}, 'text']:
+            with patch.object(
+                JSONRenderer, 'render', wraps=JSONRenderer().render,
+            ) as fallback:
+                output = renderers.FastJSONRenderer().render(data)
+            fallback.assert_not_called()
+            self.assertEqual(output, JSONRenderer().render(data))
+
+    def test_big_integers(self):
+        """Test integers orjson can't encode fall back to json"""
+        data = {'big': 2 ** 70}
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_same_output_indented(self):
+        """Test indented output falls back to JSONRenderer"""
+        media_type = 'application/json; indent=2'
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type),
+        )
+
+    def test_same_output_without_orjson(self):
+        """Test the stdlib fallback when orjson is not installed"""
+        with patch('core.renderers.orjson', None):
+            output = renderers.FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(output, JSONRenderer().render(SAMPLE))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the fast parser reads what JSONParser reads"""
+
+    def _parse(self, body):
+        return renderers.FastJSONParser().parse(io.BytesIO(body))
+
+    def test_same_result(self):
+        """Test parsing gives the same data as JSONParser"""
+        body = '{"title": "Crème", "price": "5.00", "tags": [{"a": 1.5}]}'
+        self.assertEqual(
+            self._parse(body.encode()),
+            JSONParser().parse(io.BytesIO(body.encode())),
+        )
+
+    def test_invalid_json(self):
+        """Test invalid bodies raise a ParseError"""
+        for body in [b'{"title": ', b'{"price": NaN}', b'\xff']:
+            with self.assertRaises(ParseError):
+                self._parse(body)
+
+
+class RendererApiTests(TestCase):
+    """Test the API responses through the configured renderers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Crème brûlée',
+            time_minutes=10,
+            price=Decimal('5.50'),
+            description='Sample description',
+        )
+        self.url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+
+    def test_json_response(self):
+        """Test JSON responses match JSONRenderer's rendering"""
+        res = self.client.get(self.url)
+
+        self.assertIsInstance(
+            res.accepted_renderer, renderers.FastJSONRenderer,
+        )
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
+        self.assertIn(b'"price":"5.50"', res.content)
+
+    def test_json_request(self):
+        """Test JSON request bodies are parsed"""
+        res = self.client.patch(
+            self.url, {'title': 'Crème caramel'}, format='json',
+        )
+
+        self.assertEqual(res.data['title'], 'Crème caramel')
+
+    @skipIf(renderers.msgpack is None, 'msgpack is not installed')
+    def test_msgpack_response(self):
+        """Test MessagePack is returned when accepted"""
+        res = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            renderers.msgpack.unpackb(res.content, raw=False)['price'],
+            '5.50',
+        )
@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration for serving the API in production.
+
+Serve WSGI with `gunicorn app.wsgi -c gunicorn.conf.py`, or ASGI by
+also passing `-k uvicorn.workers.UvicornWorker` (see scripts/run.sh).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Processes sized from the CPUs available, threads let each process keep
+# serving while requests wait on Postgres. Empty values, as docker-compose
+# passes for unset variables, mean the default.
+workers = int(
+    os.environ.get('GUNICORN_WORKERS') or multiprocessing.cpu_count() * 2 + 1
+)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,133 @@
+"""
+Set-based rename, delete and merge of many tags or ingredients at once
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Min
+
+from rest_framework.exceptions import ValidationError
+
+from core.counts import link_fk, refresh_recipe_counts
+from core.models import normalize_name
+from core.signals import touch_recipes
+from recipe.caching import bump_generation
+
+# Most ids accepted by one batch request
+BATCH_MAX_SIZE = 1000
+
+
+def _get_owned(model, user, ids, param):
+    """Return the user's objects with the given ids, or raise a 400"""
+    objects = model.objects.filter(user=user, id__in=ids).in_bulk()
+    missing = sorted(set(ids) - set(objects))
+    if missing:
+        raise ValidationError({
+            param: [f'Unknown id(s): {", ".join(map(str, missing))}.'],
+        })
+    return objects
+
+
+def _linked_recipe_ids(model, ids):
+    through, fk = link_fk(model)
+    return list(
+        through.objects.filter(**{f'{fk}__in': ids})
+        .values_list('recipe_id', flat=True).distinct()
+    )
+
+
+def _delete_rows(model, ids):
+    """Delete rows by id in one statement, return the count.
+
+    Sends no pre/post_delete and cascades nothing, unlike delete() which
+    fetches and signals every row: the caller deletes the recipe links
+    first, then touches the recipes and bumps the cache generation.
+    """
+    if not ids:
+        return 0
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN '
+            f'({", ".join(["%s"] * len(ids))})',
+            list(ids),
+        )
+        return cursor.rowcount
+
+
+@transaction.atomic
+def rename_items(model, user, names):
+    """Rename the user's objects from {id: new name} in one UPDATE"""
+    objects = _get_owned(model, user, names, 'id')
+    taken = list(model.objects.filter(
+        user=user,
+        normalized_name__in=[normalize_name(name) for name in names.values()],
+    ).exclude(id__in=names).values_list('name', flat=True))
+    if taken:
+        raise ValidationError({
+            'name': [f'Already used: {", ".join(sorted(taken))}.'],
+        })
+
+    for obj_id, name in names.items():
+        objects[obj_id].name = name
+        objects[obj_id].normalized_name = normalize_name(name)
+    try:
+        # Swapping names between rows breaks the constraint mid-statement
+        with transaction.atomic():
+            model.objects.bulk_update(
+                objects.values(), ['name', 'normalized_name'],
+            )
+    except IntegrityError:
+        raise ValidationError({
+            'name': ['Names must not be swapped between items.'],
+        })
+
+    # bulk_update sends no post_save, recipes render the new names
+    touch_recipes(_linked_recipe_ids(model, list(objects)))
+    bump_generation(user.id)
+    return sorted(objects.values(), key=lambda obj: obj.id)
+
+
+@transaction.atomic
+def delete_items(model, user, ids):
+    """Delete the user's objects and their recipe links, return the count"""
+    _get_owned(model, user, ids, 'ids')
+    through, fk = link_fk(model)
+    recipe_ids = _linked_recipe_ids(model, ids)
+
+    through.objects.filter(**{f'{fk}__in': ids}).delete()
+    deleted = _delete_rows(model, ids)
+
+    touch_recipes(recipe_ids)
+    bump_generation(user.id)
+    return deleted
+
+
+@transaction.atomic
+def merge_items(model, target, source_ids):
+    """Move the recipe links of the sources to target, then delete them.
+
+    Links are moved with one UPDATE. Recipes that would end up linked
+    twice, to the target already or to several sources, keep one link.
+    """
+    if target.id in source_ids:
+        raise ValidationError({
+            'sources': ['The target can not be one of the sources.'],
+        })
+    _get_owned(model, target.user, source_ids, 'sources')
+    through, fk = link_fk(model)
+    recipe_ids = _linked_recipe_ids(model, source_ids)
+
+    links = through.objects.filter(**{f'{fk}__in': source_ids})
+    links.filter(recipe_id__in=through.objects.filter(
+        **{fk: target.id}
+    ).values('recipe_id')).delete()
+    links.exclude(id__in=links.order_by().values('recipe_id').annotate(
+        first=Min('id'),
+    ).values('first')).delete()
+    links.update(**{fk: target.id})
+    _delete_rows(model, source_ids)
+
+    refresh_recipe_counts(model, [target.id])
+    touch_recipes(recipe_ids)
+    bump_generation(target.user_id)
+    target.refresh_from_db(fields=['recipe_count'])
+    return target
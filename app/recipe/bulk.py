@@ -0,0 +1,161 @@
+"""
+Bulk import and export of recipes as newline delimited JSON (NDJSON),
+and export of tags and ingredients as NDJSON or CSV
+"""
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from core.counts import refresh_recipe_counts
+from core.renderers import FastJSONRenderer
+from core.models import Recipe, Tag, Ingredient
+from core.search import refresh_search_vectors
+from recipe.serializers import get_or_create_by_name
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+CSV_CONTENT_TYPE = 'text/csv'
+EXPORT_FORMATS = {'ndjson': NDJSON_CONTENT_TYPE, 'csv': CSV_CONTENT_TYPE}
+
+# Recipes written per transaction when importing
+IMPORT_CHUNK_SIZE = 500
+# Rows fetched per round trip from the server-side cursor when exporting
+EXPORT_CHUNK_SIZE = 500
+
+
+def import_recipes(lines, user, serializer_class, context, chunk_size=None):
+    """Validate and create one recipe per NDJSON line.
+
+    Valid recipes are written in chunks, each in its own transaction, so
+    memory is bounded by the chunk size rather than the upload size.
+    Invalid lines are skipped; returns (created count, list of errors).
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    created = 0
+    errors = []
+    chunk = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            errors.append({'line': line_number, 'errors': str(exc)})
+            continue
+
+        serializer = serializer_class(data=data, context=context)
+        if not serializer.is_valid():
+            errors.append({'line': line_number, 'errors': serializer.errors})
+            continue
+
+        chunk.append(serializer.validated_data)
+        if len(chunk) >= chunk_size:
+            created += _create_chunk(chunk, user)
+            chunk = []
+
+    if chunk:
+        created += _create_chunk(chunk, user)
+
+    return created, errors
+
+
+@transaction.atomic
+def _create_chunk(chunk, user):
+    """Create a chunk of validated recipes and link their tags/ingredients"""
+    recipes = Recipe.objects.bulk_create([
+        Recipe(user=user, **{
+            field: value for field, value in data.items()
+            if field not in ('tags', 'ingredients')
+        })
+        for data in chunk
+    ])
+
+    for field_name, model in [('tags', Tag), ('ingredients', Ingredient)]:
+        names = [
+            item['name']
+            for data in chunk for item in data.get(field_name, [])
+        ]
+        objects = get_or_create_by_name(model, user, names)
+        through = getattr(Recipe, field_name).through
+        fk = f'{model._meta.model_name}_id'
+        through.objects.bulk_create([
+            through(recipe_id=recipe.id, **{fk: objects[item['name']].id})
+            for recipe, data in zip(recipes, chunk)
+            for item in data.get(field_name, [])
+        ], ignore_conflicts=True)  # a name repeated within one recipe
+        # bulk_create skips the signals maintaining the counts
+        refresh_recipe_counts(model, [obj.id for obj in objects.values()])
+
+    # and the search index
+    refresh_search_vectors([recipe.id for recipe in recipes])
+
+    return len(recipes)
+
+
+def export_recipes(queryset, prefetches, serializer_class, context,
+                   chunk_size=None):
+    """Yield one NDJSON line per recipe in queryset.
+
+    Rows are streamed from a server-side cursor and relations are
+    prefetched a chunk at a time, keeping memory constant.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    renderer = FastJSONRenderer()
+    chunk = []
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(recipe)
+        if len(chunk) >= chunk_size:
+            yield from _render_chunk(
+                chunk, prefetches, serializer_class, context, renderer,
+            )
+            chunk = []
+
+    if chunk:
+        yield from _render_chunk(
+            chunk, prefetches, serializer_class, context, renderer,
+        )
+
+
+def _render_chunk(chunk, prefetches, serializer_class, context, renderer):
+    """Prefetch the chunk's relations and render it as NDJSON lines"""
+    prefetch_related_objects(chunk, *prefetches)
+    for data in serializer_class(chunk, many=True, context=context).data:
+        yield renderer.render(data) + b'\n'
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fields, export_format, chunk_size=None):
+    """Yield the given fields of every row in queryset as NDJSON or CSV.
+
+    Rows are read as tuples from a server-side cursor and yielded a chunk
+    at a time, keeping memory constant. CSV output starts with a header.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields).encode()
+
+        def render(row):
+            return writer.writerow(row).encode()
+    else:
+        renderer = FastJSONRenderer()
+
+        def render(row):
+            return renderer.render(dict(zip(fields, row))) + b'\n'
+
+    lines = []
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        lines.append(render(row))
+        if len(lines) >= chunk_size:
+            yield b''.join(lines)
+            lines = []
+
+    if lines:
+        yield b''.join(lines)
@@ -0,0 +1,132 @@
+"""
+Per-user caching of rendered list responses for the recipe APIs
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+GENERATION_KEY = 'recipe:generation:{user_id}'
+RESPONSE_KEY = 'recipe:response:{user_id}:{generation}:{digest}'
+
+
+def _new_generation():
+    # Time based so a generation evicted from the cache is never reused
+    return time.time_ns()
+
+
+def get_generation(user_id):
+    """Return the current cache generation of a user's recipe data"""
+    key = GENERATION_KEY.format(user_id=user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id):
+    """Invalidate every cached response of a user"""
+    key = GENERATION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:  # not cached, any new generation will do
+        cache.set(key, _new_generation(), timeout=None)
+
+
+class CachedListMixin:
+    """Serve list responses from a per-user cache of the rendered JSON.
+
+    Entries are keyed on the user's generation, so any write bumping it
+    invalidates them, and carry an ETag so clients sending a matching
+    If-None-Match get a 304 without the database being queried.
+    """
+    # Comma separated id lists whose order does not change the result
+    cache_normalized_params = ()
+    # Renderer formats whose responses are cached
+    cache_formats = ('json', 'msgpack')
+
+    def get_list_validators(self, digest):
+        """Return (etag, last_modified) computed without serializing.
+
+        Return None to use a hash of the rendered content as ETag.
+        """
+        return None
+
+    def _get_list_digest(self, request):
+        params = []
+        for name, values in sorted(request.query_params.lists()):
+            if name in self.cache_normalized_params:
+                values = sorted({
+                    item for value in values for item in value.split(',')
+                })
+            params.append((name, values))
+
+        return hashlib.md5(repr((
+            self.basename, self.action, request.accepted_media_type, params,
+        )).encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format not in self.cache_formats:
+            return super().list(request, *args, **kwargs)
+
+        digest = self._get_list_digest(request)
+        key = RESPONSE_KEY.format(
+            user_id=request.user.id,
+            generation=get_generation(request.user.id),
+            digest=digest,
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type'],
+            )
+            _set_validators(response, entry['etag'], entry['last_modified'])
+            return get_conditional_response(
+                request,
+                etag=entry['etag'],
+                last_modified=entry['last_modified'],
+                response=response,
+            )
+
+        etag = last_modified = None
+        validators = self.get_list_validators(digest)
+        if validators is not None:
+            etag, last_modified = validators
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+            )
+            if not_modified is not None:
+                _set_validators(not_modified, etag, last_modified)
+                return not_modified
+
+        response = super().list(request, *args, **kwargs)
+
+        def store(response):
+            response_etag = etag or (
+                '"%s"' % hashlib.md5(response.content).hexdigest()
+            )
+            _set_validators(response, response_etag, last_modified)
+            cache.set(key, {
+                'etag': response_etag,
+                'last_modified': last_modified,
+                'content': response.content,
+                'content_type': response['Content-Type'],
+            }, settings.RECIPE_RESPONSE_CACHE_TTL)
+
+        if response.status_code == 200:
+            response.add_post_render_callback(store)
+
+        return response
+
+
+def _set_validators(response, etag, last_modified):
+    """Set the ETag/Last-Modified headers of a cacheable response"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Accept', 'Authorization'])
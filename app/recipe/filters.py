@@ -0,0 +1,110 @@
+"""
+Filtering recipes by their tags and ingredients
+"""
+from django.db.models import Count, Exists, OuterRef
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+
+from core.models import Recipe
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+# Largest value of a bigint primary key
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_ids(value, param):
+    """Return the ids of a comma separated query param, or raise a 400"""
+    ids = set()
+    for item in value.split(','):
+        item = item.strip()
+        # isdigit() alone also accepts digits int() can't parse, such as ²
+        if not (item.isascii() and item.isdigit()) or not (
+            0 < int(item) <= MAX_ID
+        ):
+            raise ValidationError({
+                param: [f'"{item}" is not a valid id.'],
+            })
+        ids.add(int(item))
+    return sorted(ids)
+
+
+def parse_names(value, param, choices):
+    """Return the set of names in a comma separated query param.
+
+    Raise a 400 for names not in choices.
+    """
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    invalid = sorted(names - set(choices))
+    if invalid:
+        raise ValidationError({
+            param: [f'Unknown field(s): {", ".join(invalid)}.'],
+        })
+    return names
+
+
+def parse_flag(value, param):
+    """Return whether a 0/1 query param is set, or raise a 400"""
+    if value in (None, '', '0'):
+        return False
+    if value == '1':
+        return True
+    raise ValidationError({param: ['Expected 0 or 1.']})
+
+
+def parse_match(value):
+    """Return a valid match mode, or raise a 400"""
+    value = value or MATCH_ANY
+    if value not in MATCH_CHOICES:
+        raise ValidationError({
+            'match': [f'Expected one of: {", ".join(MATCH_CHOICES)}.'],
+        })
+    return value
+
+
+def filter_by_related(queryset, field_name, ids, match=MATCH_ANY):
+    """Filter recipes linked to any or all of ids through field_name.
+
+    Both modes query the through table in a subquery instead of joining
+    it, so recipes are not repeated and need no DISTINCT.
+    """
+    through = getattr(Recipe, field_name).through
+    related_model = Recipe._meta.get_field(field_name).related_model
+    fk = f'{related_model._meta.model_name}_id'
+    links = through.objects.filter(**{f'{fk}__in': ids})
+
+    if match == MATCH_ALL:
+        # Links are unique, so a recipe with as many matching links as
+        # requested ids has all of them
+        return queryset.filter(id__in=(
+            links.order_by()
+            .values('recipe_id')
+            .annotate(matched=Count(fk))
+            .filter(matched=len(ids))
+            .values('recipe_id')
+        ))
+
+    return queryset.filter(Exists(links.filter(recipe_id=OuterRef('pk'))))
+
+
+def filter_assigned(queryset, field_name):
+    """Filter tags or ingredients to those linked to a recipe"""
+    through = getattr(Recipe, field_name).through
+    fk = f'{queryset.model._meta.model_name}_id'
+    return queryset.filter(
+        Exists(through.objects.filter(**{fk: OuterRef('pk')}))
+    )
+
+
+class TieBreakOrderingFilter(OrderingFilter):
+    """OrderingFilter that ends the ordering with id, for stable pages"""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not {'id', '-id'} & set(ordering):
+            descending = ordering and ordering[0].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
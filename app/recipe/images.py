@@ -0,0 +1,104 @@
+"""
+Background generation of resized recipe image renditions
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+from recipe.caching import bump_generation
+
+logger = logging.getLogger(__name__)
+
+# Pillow format and save options for each rendition extension
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-image',
+)
+
+
+def schedule_renditions(recipe_id):
+    """Render the recipe's image variants once the upload is committed"""
+    transaction.on_commit(lambda: _submit(recipe_id))
+
+
+def _submit(recipe_id):
+    if settings.RECIPE_IMAGE_RENDITIONS_ASYNC:
+        _executor.submit(_run_in_worker, recipe_id)
+    else:
+        generate_renditions(recipe_id)
+
+
+def _run_in_worker(recipe_id):
+    try:
+        generate_renditions(recipe_id)
+    except Exception:
+        logger.exception('Rendering image of recipe %s failed', recipe_id)
+    finally:
+        # Worker threads get their own connections, don't leak them
+        connections.close_all()
+
+
+def _target_widths(width):
+    """Return the configured widths smaller than the original"""
+    widths = [
+        target for target in settings.RECIPE_IMAGE_RENDITION_WIDTHS
+        if target < width
+    ]
+    return widths or [width]
+
+
+def generate_renditions(recipe_id):
+    """Write resized, EXIF free WebP and JPEG copies of a recipe's image"""
+    recipe = Recipe.objects.filter(id=recipe_id).only(
+        'id', 'user_id', 'image',
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+
+    source_name = recipe.image.name
+    base = os.path.splitext(source_name)[0]
+    variants = {}
+    with recipe.image.open('rb') as source, Image.open(source) as image:
+        # Apply the EXIF orientation since the metadata is not copied over
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for width in _target_widths(image.width):
+            resized = image.copy()
+            resized.thumbnail((width, image.height), Image.LANCZOS)
+            for ext, (image_format, options) in RENDITION_FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, image_format, **options)
+                name = default_storage.save(
+                    f'{base}_{width}w.{ext}', ContentFile(buffer.getvalue()),
+                )
+                variants.setdefault(ext, {})[str(width)] = name
+
+    # Skip recording if another image was uploaded in the meantime
+    recorded = Recipe.objects.filter(id=recipe_id, image=source_name).update(
+        image_variants=variants, updated_at=timezone.now(),
+    )
+    if recorded:
+        bump_generation(recipe.user_id)
+    else:
+        delete_renditions(variants)
+
+
+def delete_renditions(variants):
+    """Delete the files of a recipe's image_variants"""
+    for names in variants.values():
+        for name in names.values():
+            default_storage.delete(name)
@@ -0,0 +1,121 @@
+"""
+Read-only fast path rendering recipe lists from values() rows
+"""
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core.models import Recipe
+
+# Fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+
+def _passthrough(value):
+    return value
+
+
+def get_row_plan(serializer):
+    """Return how to render rows as serializer would, or None if unsupported.
+
+    The plan is a list of (name, column, convert, nested plan). Only plain
+    model columns and nested many=True serializers of related columns are
+    supported.
+    """
+    model_fields = {field.name: field for field in Recipe._meta.get_fields()}
+    plan = []
+    for name, field in serializer.fields.items():
+        model_field = model_fields.get(field.source)
+        if model_field is None:
+            return None
+        if isinstance(field, serializers.ListSerializer):
+            if not model_field.many_to_many:
+                return None
+            nested = [
+                (child_name, child.source, _get_converter(child), None)
+                for child_name, child in field.child.fields.items()
+            ]
+            plan.append((name, field.source, None, nested))
+        elif isinstance(field, serializers.FileField):
+            # Renders the URL of a FieldFile, not of the stored name
+            return None
+        elif model_field.concrete and not model_field.many_to_many:
+            plan.append((name, field.source, _get_converter(field), None))
+        else:
+            return None
+    return plan
+
+
+def _get_converter(field):
+    if type(field) in PASSTHROUGH_FIELDS:
+        return _passthrough
+    return field.to_representation
+
+
+def get_columns(plan):
+    """Return the recipe columns read by a row plan"""
+    return [column for _, column, _, nested in plan if nested is None]
+
+
+def _get_related_map(field_name, nested, recipe_ids):
+    """Return {recipe id: [item, ...]} in one query, items ordered by id"""
+    through = getattr(Recipe, field_name).through
+    related = Recipe._meta.get_field(field_name).related_model
+    prefix = related._meta.model_name
+    rows = through.objects.filter(recipe_id__in=recipe_ids).order_by(
+        f'{prefix}_id'
+    ).values_list('recipe_id', *[
+        f'{prefix}__{column}' for _, column, _, _ in nested
+    ])
+
+    related_map = {}
+    for recipe_id, *values in rows:
+        related_map.setdefault(recipe_id, []).append({
+            name: None if value is None else convert(value)
+            for (name, _, convert, _), value in zip(nested, values)
+        })
+    return related_map
+
+
+def render_rows(rows, plan):
+    """Render values() rows of recipes like the serializer would"""
+    recipe_ids = [row['id'] for row in rows]
+    related_maps = {
+        column: _get_related_map(column, nested, recipe_ids)
+        for _, column, _, nested in plan if nested is not None
+    }
+
+    rendered = []
+    for row in rows:
+        item = {}
+        for name, column, convert, nested in plan:
+            if nested is not None:
+                item[name] = related_maps[column].get(row['id'], [])
+            else:
+                value = row[column]
+                item[name] = None if value is None else convert(value)
+        rendered.append(item)
+    return rendered
+
+
+class ValuesListMixin:
+    """Build list responses from values() rows instead of serializing models.
+
+    Writes and anything the row plan can't render use the serializers.
+    """
+    values_list_enabled = True
+
+    def list(self, request, *args, **kwargs):
+        plan = get_row_plan(self.get_serializer())
+        if not self.values_list_enabled or plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = ['id'] + get_columns(plan)
+        if 'rank' in queryset.query.annotations:
+            columns.append('rank')  # the pagination orders search by it
+        rows = queryset.prefetch_related(None).values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(render_rows(page, plan))
+        return Response(render_rows(list(rows), plan))
@@ -1,16 +1,94 @@
 """Serializers for the recipe app."""
 
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, normalize_name
+from recipe.batch import BATCH_MAX_SIZE
 
-class IngredientSerializer(serializers.ModelSerializer):
+
+def get_or_create_by_name(model, user, names):
+    """Return {name: object} for the user's tags or ingredients in names.
+
+    Names are matched by their normalized form, so "Salt" and "salt " give
+    the same object. Looks up all names in one query and creates the
+    missing ones with a single bulk insert, so the cost does not grow with
+    the number of names.
+    """
+    names = list(dict.fromkeys(names))  # drop repeats, keep order
+    if not names:
+        return {}
+
+    normalized = {name: normalize_name(name) for name in names}
+    found = {
+        obj.normalized_name: obj
+        for obj in model.objects.filter(
+            user=user, normalized_name__in=normalized.values(),
+        )
+    }
+    # The first spelling of a new name is the one stored
+    missing = {}
+    for name in names:
+        if normalized[name] not in found:
+            missing.setdefault(normalized[name], name)
+    if missing:
+        # Rows created concurrently are skipped by the unique constraint,
+        # and bulk_create can't return ids for skipped rows: re-read them.
+        model.objects.bulk_create(
+            [
+                model(user=user, name=name, normalized_name=key)
+                for key, name in missing.items()
+            ],
+            ignore_conflicts=True,
+        )
+        found.update(
+            (obj.normalized_name, obj)
+            for obj in model.objects.filter(
+                user=user, normalized_name__in=missing,
+            )
+        )
+
+    return {name: found[normalized[name]] for name in names}
+
+
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for the user owned, uniquely named recipe attributes"""
+
+    def validate_name(self, value):
+        """Reject renaming onto a name the user already has"""
+        # Nested under a recipe, an existing name means reuse that object
+        if self.parent is None:
+            queryset = self.Meta.model.objects.filter(
+                user=self.context['request'].user,
+                normalized_name=normalize_name(value),
+            )
+            if self.instance is not None:
+                queryset = queryset.exclude(id=self.instance.id)
+            if queryset.exists():
+                raise serializers.ValidationError(
+                    f'{self.Meta.model.__name__} with this name already '
+                    'exists.'
+                )
+        return value
+
+    def update(self, instance, validated_data):
+        """Save only the edited fields, recipe_count is kept by the database"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+
+        return instance
+
+
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredient objects"""
     class Meta:
         model = Ingredient  # Model that the ingredient serializer is based on
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -18,7 +96,90 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class IngredientWithCountSerializer(IngredientSerializer):
+    """Serializer for ingredients with the number of recipes using them"""
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class TagWithCountSerializer(TagSerializer):
+    """Serializer for tags with the number of recipes using them"""
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
+class BatchRenameListSerializer(serializers.ListSerializer):
+    """List of renames applied together"""
+
+    def validate(self, attrs):
+        if not attrs or len(attrs) > BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Expected 1 to {BATCH_MAX_SIZE} items.'
+            )
+        for key, values in [
+            ('id', [item['id'] for item in attrs]),
+            ('name', [normalize_name(item['name']) for item in attrs]),
+        ]:
+            if len(set(values)) != len(values):
+                raise serializers.ValidationError(
+                    f'Each {key} can only be given once.'
+                )
+        return attrs
+
+
+class BatchRenameSerializer(serializers.Serializer):
+    """Serializer for renaming one of many tags or ingredients"""
+    id = serializers.IntegerField(min_value=1)
+    name = serializers.CharField(max_length=255)
+
+    class Meta:
+        list_serializer_class = BatchRenameListSerializer
+
+
+class BatchDeleteSerializer(serializers.Serializer):
+    """Serializer for the ids of tags or ingredients to delete"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1, max_length=BATCH_MAX_SIZE,
+    )
+
+
+class MergeSerializer(serializers.Serializer):
+    """Serializer for the tags or ingredients merged into another"""
+    sources = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1, max_length=BATCH_MAX_SIZE,
+    )
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of the resized image renditions, empty until they are generated"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for ext, names in value.items():
+            variants[ext] = {}
+            for width, name in names.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[ext][width] = url
+        return variants
+
+
+class DynamicFieldsMixin:
+    """Let the view render a subset of the serializer's fields"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes"""
     tags = TagSerializer(many=True, required=False)  # many=True, because we are serializing a list of objects
     ingredients = IngredientSerializer(many=True, required=False)
@@ -28,25 +189,15 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags',
                   'ingredients']
         read_only_fields = ['id']
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tag as needed, internal method不会在其他地方被调用"""
+
+    def _get_or_create_objects(self, model, items):
+        """Return the user's objects named in items, creating missing ones"""
         auth_user = self.context['request'].user  # HTTPrequest 对象中，可以得到当前请求用户
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        """ Handle getting or creating ingredients as needed"""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        names = [item['name'] for item in items]
+        # Different spellings of a name give the same object
+        return list(dict.fromkeys(
+            get_or_create_by_name(model, auth_user, names).values()
+        ))
 
     def create(self, validated_data):
         """Create a recipe"""
@@ -54,9 +205,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
 
-        #  Get an existing tag or create a new tag
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        #  Get existing tags or create new ones, then link them in one insert
+        recipe.tags.add(*self._get_or_create_objects(Tag, tags))
+        recipe.ingredients.add(
+            *self._get_or_create_objects(Ingredient, ingredients)
+        )
 
         return recipe
 
@@ -65,15 +218,15 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredient = validated_data.pop('ingredients', None)
 
-        # If tag is an empty list, clear all the tags
+        # set() only removes and adds the links that differ,
+        # an empty list clears them all
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_objects(Tag, tags))
 
-        # If ingredient is an empty list, clear all the ingredients
         if ingredient is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredient, instance)
+            instance.ingredients.set(
+                self._get_or_create_objects(Ingredient, ingredient)
+            )
 
         # Rest of the data (except tags), reassign to the instance
         for attr, value in validated_data.items():
@@ -86,15 +239,27 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view"""
+    image_variants = ImageVariantsField()
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_variants',
+        ]
+        # Set through the upload-image action
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + ['image']
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """ Serializer for uploading images to recipes"""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe # Link to the recipe model
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_variants']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': True}}  #  extra_kwargs: 用于指定特定字段的额外参数，这里指定了image字段是必须的
+
+    def validate_image(self, value):
+        """Limit the size of uploaded images"""
+        if value.size > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError('Image file too large.')
+        return value
@@ -12,6 +12,7 @@ from core.models import (
     Ingredient,
     Recipe
 )
+from core.queries import QueryDetectorTestMixin
 from recipe.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
@@ -36,7 +37,8 @@ class PublicIngredientsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateIngredientsApiTests(TestCase):
+
+class PrivateIngredientsApiTests(QueryDetectorTestMixin, TestCase):
     """Test authenticated API requests"""
     def setUp(self):
         self.user = create_user()
@@ -53,7 +55,7 @@ class PrivateIngredientsApiTests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True) # many=True because we are serializing a list of objects, many items
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients returned are for the authenticated user"""
@@ -64,9 +66,9 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1) # only one ingredient
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']), 1)  # only one ingredient
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
 
     def test_update_ingredients(self):
         """ Test updating an ingredient"""
@@ -107,8 +109,8 @@ class PrivateIngredientsApiTests(TestCase):
         s1 = IngredientSerializer(ingredient1)
         s2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filter_ingredients_assigned_unique(self):
         """ Test filtering ingredients by assigned returns unique items"""
@@ -132,4 +134,23 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1) # only one ingredient
\ No newline at end of file
+        self.assertEqual(len(res.data['results']), 1)  # only one ingredient
+
+    def test_ingredients_with_counts(self):
+        """ Test with_counts includes unused ingredients with a zero count"""
+        ing = Ingredient.objects.create(user=self.user, name='potato')
+        Ingredient.objects.create(user=self.user, name='carrot')
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Potato soup',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        recipe.ingredients.add(ing)
+
+        res = self.client.get(INGREDIENTS_URL, {'with_counts': 1})
+
+        counts = {
+            item['name']: item['recipe_count'] for item in res.data['results']
+        }
+        self.assertEqual(counts, {'potato': 1, 'carrot': 0})
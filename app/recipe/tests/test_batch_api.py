@@ -0,0 +1,183 @@
+"""
+Tests for the bulk rename, delete and merge of tags and ingredients
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def merge_url(tag_id):
+    """Return the tag merge URL"""
+    return reverse('recipe:tag-merge', args=[tag_id])
+
+
+def create_recipe(user, title, tags=()):
+    """Create and return a recipe linked to tags"""
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=5, price=Decimal('2.50'),
+    )
+    recipe.tags.add(*tags)
+    return recipe
+
+
+class BatchApiTests(TestCase):
+    """Test the batch endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_rename(self):
+        """Test renaming many tags updates them and their recipes"""
+        tag1 = Tag.objects.create(user=self.user, name='tomato')
+        tag2 = Tag.objects.create(user=self.user, name='basil')
+        recipe = create_recipe(self.user, 'Salad', [tag1])
+        updated_at = Recipe.objects.get(id=recipe.id).updated_at
+
+        res = self.client.patch(TAGS_BULK_URL, [
+            {'id': tag2.id, 'name': 'Basil'},
+            {'id': tag1.id, 'name': 'Tomato'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': tag1.id, 'name': 'Tomato'},
+            {'id': tag2.id, 'name': 'Basil'},
+        ])
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+        res = self.client.get(RECIPES_URL, {'search': 'Tomato'})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_rename_invalid(self):
+        """Test bad renames are rejected and change nothing"""
+        tag1 = Tag.objects.create(user=self.user, name='Tomato')
+        tag2 = Tag.objects.create(user=self.user, name='Tomatoes')
+        other = Tag.objects.create(
+            user=get_user_model().objects.create_user(
+                email='other@example.com', password='test123',
+            ),
+            name='Other',
+        )
+
+        for payload in [
+            [],
+            [{'id': tag1.id, 'name': 'A'}, {'id': tag1.id, 'name': 'B'}],
+            [{'id': tag1.id, 'name': 'A'}, {'id': tag2.id, 'name': 'a '}],
+            [{'id': tag2.id, 'name': 'TOMATO'}],
+            [
+                {'id': tag1.id, 'name': 'tomatoes'},
+                {'id': tag2.id, 'name': 'X'},
+            ],
+            [{'id': other.id, 'name': 'Mine'}],
+        ]:
+            res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(
+            set(Tag.objects.values_list('name', flat=True)),
+            {'Tomato', 'Tomatoes', 'Other'},
+        )
+
+    def test_bulk_delete(self):
+        """Test deleting many tags in one request"""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['A', 'B', 'C']
+        ]
+        recipe = create_recipe(self.user, 'Soup', tags)
+        self.client.get(TAGS_URL)  # cached
+
+        res = self.client.delete(
+            TAGS_BULK_URL, {'ids': [tags[0].id, tags[1].id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 2})
+        self.assertEqual(list(recipe.tags.all()), [tags[2]])
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([tag['name'] for tag in res.data['results']], ['C'])
+
+    def test_bulk_delete_other_user(self):
+        """Test ids of other users are rejected"""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123',
+        )
+        tag = Tag.objects.create(user=self.user, name='Mine')
+        other_tag = Tag.objects.create(user=other, name='Theirs')
+
+        res = self.client.delete(
+            TAGS_BULK_URL, {'ids': [tag.id, other_tag.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_merge(self):
+        """Test merging repoints the links and deletes the sources"""
+        target = Tag.objects.create(user=self.user, name='Tomato')
+        source1 = Tag.objects.create(user=self.user, name='Tomatoes')
+        source2 = Tag.objects.create(user=self.user, name='Roma')
+        both = create_recipe(self.user, 'Salad', [target, source1])
+        sources = create_recipe(self.user, 'Soup', [source1, source2])
+        one = create_recipe(self.user, 'Sauce', [source2])
+        create_recipe(self.user, 'Bread')
+
+        res = self.client.post(
+            merge_url(target.id),
+            {'sources': [source1.id, source2.id]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, {'id': target.id, 'name': 'Tomato', 'recipe_count': 3},
+        )
+        self.assertEqual(list(Tag.objects.all()), [target])
+        for recipe in [both, sources, one]:
+            self.assertEqual(list(recipe.tags.all()), [target])
+
+    def test_merge_invalid(self):
+        """Test merging into a source or from unknown ids fails"""
+        target = Tag.objects.create(user=self.user, name='Tomato')
+        source = Tag.objects.create(user=self.user, name='Tomatoes')
+
+        for sources in [[], [target.id], [source.id, source.id + 100]]:
+            res = self.client.post(
+                merge_url(target.id), {'sources': sources}, format='json',
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_merge_ingredients(self):
+        """Test ingredients can be merged the same way"""
+        target = Ingredient.objects.create(user=self.user, name='Salt')
+        source = Ingredient.objects.create(user=self.user, name='Sea salt')
+        recipe = create_recipe(self.user, 'Soup')
+        recipe.ingredients.add(source)
+
+        res = self.client.post(
+            reverse('recipe:ingredient-merge', args=[target.id]),
+            {'sources': [source.id]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(list(recipe.ingredients.all()), [target])
@@ -0,0 +1,174 @@
+"""
+Tests for the recipe bulk import and export APIs
+"""
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def to_ndjson(items):
+    """Return items encoded as an NDJSON body"""
+    return '\n'.join(json.dumps(item) for item in items) + '\n'
+
+
+class PublicBulkApiTests(TestCase):
+    """Test unauthenticated bulk API requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to import or export"""
+        res = self.client.post(
+            BULK_URL, '{}', content_type='application/x-ndjson',
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(TestCase):
+    """Test authenticated bulk API requests"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _import(self, items):
+        return self.client.post(
+            BULK_URL,
+            to_ndjson(items),
+            content_type='application/x-ndjson',
+        )
+
+    def test_import_recipes(self):
+        """Test importing recipes with nested tags and ingredients"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        items = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'description': 'Description',
+                'tags': [{'name': 'Vegan'}, {'name': 'Dinner'}],
+                'ingredients': [{'name': 'Salt'}],
+            }
+            for i in range(5)
+        ]
+
+        with patch('recipe.bulk.IMPORT_CHUNK_SIZE', 2):
+            res = self._import(items)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'created': 5, 'errors': []})
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        for recipe in recipes:
+            self.assertIn(vegan, recipe.tags.all())
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), 1)
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 5)
+        self.assertEqual(Ingredient.objects.get().recipe_count, 5)
+
+    def test_import_reports_invalid_lines(self):
+        """Test invalid lines are skipped and reported"""
+        body = to_ndjson([
+            {
+                'title': 'Valid',
+                'time_minutes': 10,
+                'price': '5.00',
+                'description': 'Description',
+            },
+            {'title': 'Missing fields'},
+        ]) + 'not json\n'
+
+        res = self.client.post(
+            BULK_URL, body, content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual([e['line'] for e in res.data['errors']], [2, 3])
+        self.assertTrue(Recipe.objects.filter(title='Valid').exists())
+
+    def test_import_requires_ndjson(self):
+        """Test importing another content type is rejected"""
+        res = self.client.post(BULK_URL, [], format='json')
+
+        self.assertEqual(
+            res.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+
+    def test_export_recipes(self):
+        """Test exporting streams the user's recipes as NDJSON"""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(user=other_user)
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipes[0].tags.add(tag)
+
+        with patch('recipe.bulk.EXPORT_CHUNK_SIZE', 2):
+            res = self.client.get(EXPORT_URL)
+            body = b''.join(res.streaming_content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [recipe.id for recipe in reversed(recipes)],
+        )
+        self.assertEqual(rows[-1]['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+        self.assertEqual(rows[0]['description'], 'Sample description')
+
+    def test_export_then_import_round_trip(self):
+        """Test an export can be imported again"""
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+        body = b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+        res = self.client.post(
+            BULK_URL, body, content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
@@ -0,0 +1,112 @@
+"""
+Tests for the fields= and expand= response shaping of the recipe APIs
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeFieldsTests(TestCase):
+    """Test trimming and expanding recipe responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=Decimal('5.00'),
+            description='Sample description',
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def test_list_sparse_fields(self):
+        """Test fields= trims the response and skips unused relations"""
+        # validators aggregate and recipes, no tag or ingredient prefetch
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title,price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{
+            'id': self.recipe.id,
+            'title': 'Sample recipe',
+            'price': '5.00',
+        }])
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"description"', queries[1]['sql'])
+        self.assertNotIn('"link"', queries[1]['sql'])
+
+    def test_list_expand(self):
+        """Test expand= adds detail fields to the default list fields"""
+        res = self.client.get(RECIPES_URL, {'expand': 'description'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(recipe['description'], 'Sample description')
+        self.assertEqual(recipe['tags'], [
+            {'id': self.recipe.tags.get().id, 'name': 'Vegan'},
+        ])
+
+    def test_fields_and_expand(self):
+        """Test expand= adds to the fields picked with fields="""
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'id', 'expand': 'description'},
+        )
+
+        self.assertEqual(res.data['results'], [{
+            'id': self.recipe.id,
+            'description': 'Sample description',
+        }])
+
+    def test_unknown_field(self):
+        """Test unknown field names return a 400"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_retrieve_sparse_fields(self):
+        """Test fields= on the detail with its own ETag"""
+        full = self.client.get(detail_url(self.recipe.id))
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            {'fields': 'title'},
+            HTTP_IF_NONE_MATCH=full['ETag'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'title': 'Sample recipe'})
+        self.assertNotEqual(res['ETag'], full['ETag'])
+
+    def test_writes_ignore_fields(self):
+        """Test fields= does not restrict what can be written"""
+        res = self.client.patch(
+            detail_url(self.recipe.id) + '?fields=id',
+            {'title': 'New title'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'New title')
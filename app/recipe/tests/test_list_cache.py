@@ -0,0 +1,137 @@
+"""
+Tests for the per-user list response cache
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ListCacheTests(TestCase):
+    """Test list responses are cached per user and invalidated on writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test an unchanged list is returned without querying"""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_matching_etag_not_modified(self):
+        """Test a client with the current ETag gets a 304"""
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_create_invalidates(self):
+        """Test creating a recipe through the API invalidates the list"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        payload = {
+            'title': 'New recipe',
+            'time_minutes': 5,
+            'price': '2.50',
+            'description': 'Description',
+        }
+        self.client.post(RECIPES_URL, payload)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'][0]['title'], 'New recipe')
+
+    def test_delete_invalidates(self):
+        """Test deleting a recipe invalidates the list"""
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        self.client.delete(url)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.json()['results'], [])
+
+    def test_tag_rename_invalidates_recipes(self):
+        """Test renaming a tag refreshes recipes showing it"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        self.client.get(RECIPES_URL)
+        self.client.get(TAGS_URL)
+
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(url, {'name': 'Vegetarian'})
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(
+            res.json()['results'][0]['tags'][0]['name'], 'Vegetarian',
+        )
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.json()['results'][0]['name'], 'Vegetarian')
+
+    def test_filter_ids_order_shares_entry(self):
+        """Test filters naming the same ids in another order hit the cache"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        with self.assertNumQueries(0):
+            self.client.get(RECIPES_URL, {'tags': f'{tag2.id},{tag1.id}'})
+        with self.assertNumQueries(2):  # validators and the page
+            self.client.get(RECIPES_URL, {'tags': f'{tag1.id}'})
+
+    def test_cache_is_per_user(self):
+        """Test users never see each other's cached lists"""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
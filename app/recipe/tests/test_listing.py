@@ -0,0 +1,91 @@
+"""
+Tests for the values() fast path of the recipe list
+"""
+from decimal import Decimal
+from urllib.parse import parse_qsl, urlsplit
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ValuesListTests(TestCase):
+    """Test the fast path renders exactly what the serializers render"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Vegan', 'Dinner', 'Spicy']
+        ]
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Tofu "firm"',
+        )
+        for i, price in enumerate(['5.5', '0.05', '999.99', '12']):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Curry №{i}',
+                time_minutes=i,
+                price=Decimal(price),
+                description='Curry with ünïcode' * i,
+                link='' if i % 2 else 'https://example.com/?a=1&b=2',
+            )
+            # Linked out of id order
+            recipe.tags.add(*reversed(self.tags[:i]))
+            if i % 2:
+                recipe.ingredients.add(self.ingredient)
+
+    def _get(self, params):
+        cache.clear()
+        return self.client.get(RECIPES_URL, params)
+
+    def _assert_same_output(self, params):
+        fast = self._get(params)
+        with patch.object(RecipeViewSet, 'values_list_enabled', False):
+            slow = self._get(params)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content, params)
+        return fast
+
+    def test_same_output(self):
+        """Test list responses are byte-identical to the serializer's"""
+        for params in [
+            {},
+            {'expand': 'description'},
+            {'fields': 'id,title,price'},
+            {'fields': 'tags'},
+            {'search': 'curry'},
+            {'tags': f'{self.tags[0].id},{self.tags[1].id}', 'match': 'all'},
+            {'format': 'json', 'page_size': 3},
+        ]:
+            self._assert_same_output(params)
+
+    def test_same_pages(self):
+        """Test the next page links and pages match"""
+        res = self._assert_same_output({'page_size': 2})
+        self._assert_same_output(
+            dict(parse_qsl(urlsplit(res.data['next']).query))
+        )
+
+    def test_query_count(self):
+        """Test the fast path queries as much as the prefetching path"""
+        cache.clear()
+        # validators aggregate, recipes, tags, ingredients
+        with self.assertNumQueries(4):
+            self.client.get(RECIPES_URL)
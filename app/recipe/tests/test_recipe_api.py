@@ -2,9 +2,13 @@ from decimal import Decimal
 
 import tempfile
 import os
+from unittest.mock import patch
 from PIL import Image
 
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -12,8 +16,15 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.queries import QueryDetectorTestMixin
 
-from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe import images
+from recipe.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    RecipeImageSerializer,
+)
+from recipe.views import RecipeViewSet
 
 RECIPES_URL = reverse('recipe:recipe-list')
 
@@ -63,7 +74,8 @@ class PublicRecipeAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateRecipeAPITests(TestCase):
+
+class PrivateRecipeAPITests(QueryDetectorTestMixin, TestCase):
     """Test authenticated recipe API requests"""
 
     def setUp(self):
@@ -81,7 +93,7 @@ class PrivateRecipeAPITests(TestCase):
 
         recipes = Recipe.objects.all().order_by('-id')  # 数据库中的结果
         serializer = RecipeSerializer(recipes, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_recipe_list_limited_to_user(self):
@@ -93,7 +105,7 @@ class PrivateRecipeAPITests(TestCase):
         res = self.client.get(RECIPES_URL)
         recipes = Recipe.objects.filter(user=self.user)  # filter by user
         serializer = RecipeSerializer(recipes, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_get_recipe_detail(self):
@@ -251,6 +263,32 @@ class PrivateRecipeAPITests(TestCase):
             ).exists()
 
             self.assertTrue(exists)
+
+    def test_create_recipe_reuses_tags_by_normalized_name(self):
+        """Test tag names differing in case or spaces give one tag"""
+        tag = Tag.objects.create(user=self.user, name='Salt')
+        payload = {
+            'title': 'Chips',
+            'time_minutes': 10,
+            'price': Decimal('2.00'),
+            'description': 'Salty',
+            'tags': [
+                {'name': 'SALT'}, {'name': 'salt '},
+                {'name': 'Vinegar'}, {'name': 'vinegar'},
+            ],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data['tags']),
+            ['Salt', 'Vinegar'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+
     def test_create_tag_on_update(self):
         """Test creating tag whrn updating a recipe"""
         recipe = create_recipe(user=self.user)
@@ -377,6 +415,65 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def _count_create_queries(self, tag_count, ingredient_count):
+        """ Return the number of queries creating a recipe runs. """
+        payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 10,
+            'price': 5.00,
+            'description': 'Sample description',
+            'tags': [{'name': f'Tag {i}'} for i in range(tag_count)],
+            'ingredients': [
+                {'name': f'Ing {i}'} for i in range(ingredient_count)
+            ],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(queries)
+
+    def test_create_recipe_nested_query_count_constant(self):
+        """ Test nested tags and ingredients are created in bulk. """
+        few = self._count_create_queries(2, 3)
+        many = self._count_create_queries(20, 30)
+
+        self.assertEqual(few, many)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 20)
+
+    def test_update_recipe_tags_keeps_unchanged_links(self):
+        """ Test updating tags only adds and removes the differences. """
+        breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        lunch = Tag.objects.create(user=self.user, name='Lunch')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(breakfast, lunch)
+        Through = Recipe.tags.through
+        kept = Through.objects.get(recipe=recipe, tag=breakfast)
+
+        payload = {'tags': [{'name': 'Breakfast'}, {'name': 'Dinner'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(Through.objects.filter(id=kept.id).exists())
+        names = set(recipe.tags.values_list('name', flat=True))
+        self.assertEqual(names, {'Breakfast', 'Dinner'})
+
+    def test_create_recipe_with_repeated_tag(self):
+        """ Test naming a tag twice links it to the recipe once. """
+        payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 10,
+            'price': 5.00,
+            'description': 'Sample description',
+            'tags': [{'name': 'Vegan'}, {'name': 'Vegan'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+
     def test_filter_recipes_by_tags(self):
         """ Test filtering recipes by tags. """
         r1 = create_recipe(user=self.user, title='Thai vegetable curry')
@@ -393,9 +490,9 @@ class PrivateRecipeAPITests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """ Test filtering ingredients by tags. """
@@ -414,12 +511,159 @@ class PrivateRecipeAPITests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
+    def test_filter_match_all_tags(self):
+        """ Test match=all only returns recipes having every tag. """
+        r1 = create_recipe(user=self.user, title='Vegan curry')
+        r2 = create_recipe(user=self.user, title='Vegan salad')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
 
-class ImageUploadTests(TestCase):
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']], [r1.id],
+        )
+
+    def test_filter_match_all_tags_and_ingredients(self):
+        """ Test match=all applies to tags and ingredients together. """
+        r1 = create_recipe(user=self.user, title='Vegan curry')
+        r2 = create_recipe(user=self.user, title='Vegan stew')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        r1.tags.add(tag)
+        r1.ingredients.add(ingredient)
+        r2.tags.add(tag)
+
+        params = {
+            'tags': f'{tag.id}',
+            'ingredients': f'{ingredient.id}',
+            'match': 'all',
+        }
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']], [r1.id],
+        )
+
+    def test_filter_any_returns_recipe_once(self):
+        """ Test a recipe matching several tags is listed once. """
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        recipe.tags.add(tag1, tag2)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'},
+            )
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertFalse(any(
+            'DISTINCT' in query['sql'] for query in queries.captured_queries
+        ))
+
+    def test_filter_invalid_ids(self):
+        """ Test junk ids return a 400 instead of failing. """
+        for value in ['abc', '1,,2', '-1', '0', str(2 ** 64), '²', '١']:
+            res = self.client.get(RECIPES_URL, {'tags': value})
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, value,
+            )
+            self.assertIn('tags', res.data)
+
+    def test_filter_invalid_match(self):
+        """ Test an unknown match mode returns a 400. """
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('match', res.data)
+
+    def _create_recipes_with_relations(self, count):
+        """ Create recipes which each have a tag and an ingredient. """
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(
+                    user=self.user, name=f'Ing {recipe.id}',
+                )
+            )
+
+    def test_list_query_count_is_constant(self):
+        """ Test listing recipes does not query once per recipe. """
+        self._create_recipes_with_relations(2)
+        # validators aggregate, recipes, tags, ingredients
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        self._create_recipes_with_relations(10)
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_retrieve_query_count(self):
+        """ Test recipe detail prefetches its tags and ingredients. """
+        self._create_recipes_with_relations(1)
+        recipe = Recipe.objects.get(user=self.user)
+
+        # updated_at check, recipe, tags, ingredients
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data['tags'][0]['name'], f'Tag {recipe.id}')
+        self.assertEqual(res.data['description'], recipe.description)
+
+    def test_list_paginated_by_cursor(self):
+        """ Test recipes are returned in pages linked by cursors. """
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipes[4].id, recipes[3].id])
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipes[2].id, recipes[1].id])
+
+    def test_cursor_stable_with_new_recipes(self):
+        """ Test recipes added after a page was read do not shift the next. """
+        recipes = [create_recipe(user=self.user) for _ in range(4)]
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        create_recipe(user=self.user)
+        res = self.client.get(res.data['next'])
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipes[1].id, recipes[0].id])
+        self.assertIsNone(res.data['next'])
+
+    def test_page_size_is_capped(self):
+        """ Test the requested page size is limited to the maximum. """
+        pagination = RecipeViewSet.pagination_class
+        with patch.object(pagination, 'max_page_size', 2):
+            for _ in range(3):
+                create_recipe(user=self.user)
+
+            res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+
+class ImageUploadTests(QueryDetectorTestMixin, TestCase):
 
     def setUp(self):
         self.client = APIClient()
@@ -432,8 +676,25 @@ class ImageUploadTests(TestCase):
 
     # Delete the image after the test
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        images.delete_renditions(self.recipe.image_variants)
         self.recipe.image.delete()
 
+    def _upload(self, size, exif=None):
+        """ Upload a JPEG of the given size, running deferred work. """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            image = Image.new('RGB', size)
+            image.save(image_file, format='JPEG', exif=exif or b'')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    url, {'image': image_file}, format='multipart',
+                )
+
+        self.recipe.refresh_from_db()
+        return res
+
     def test_upload_image(self):
         """ Test uploading an image to recipe. """
         url = image_upload_url(self.recipe.id)
@@ -457,3 +718,83 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, {'image':'notimage'}, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_IMAGE_RENDITIONS_ASYNC=False)
+    def test_upload_generates_renditions(self):
+        """ Test resized renditions are generated without EXIF data. """
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        res = self._upload((800, 600), exif=exif.tobytes())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_variants'], {})  # still rendering
+        variants = self.recipe.image_variants
+        self.assertEqual(set(variants), {'webp', 'jpg'})
+        self.assertEqual(set(variants['webp']), {'320', '640'})
+        for ext, names in variants.items():
+            for width, name in names.items():
+                with Image.open(default_storage.path(name)) as rendition:
+                    self.assertEqual(rendition.width, int(width))
+                    self.assertEqual(len(rendition.getexif()), 0)
+
+        serializer = RecipeImageSerializer(self.recipe)
+        self.assertTrue(
+            serializer.data['image_variants']['jpg']['320'].endswith('.jpg')
+        )
+
+    @override_settings(RECIPE_IMAGE_RENDITIONS_ASYNC=False)
+    def test_rendition_urls_returned_by_reads(self):
+        """ Test the detail and list return the rendered image URLs. """
+        self._upload((800, 600))
+        webp_url = 'http://testserver' + default_storage.url(
+            self.recipe.image_variants['webp']['320']
+        )
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['image'], 'http://testserver' + self.recipe.image.url,
+        )
+        self.assertEqual(res.data['image_variants']['webp']['320'], webp_url)
+
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'id,image,image_variants'},
+        )
+
+        item = res.data['results'][0]
+        self.assertEqual(
+            item['image'], 'http://testserver' + self.recipe.image.url,
+        )
+        self.assertEqual(item['image_variants']['webp']['320'], webp_url)
+
+    @override_settings(RECIPE_IMAGE_RENDITIONS_ASYNC=False)
+    def test_upload_small_image_keeps_width(self):
+        """ Test images narrower than every rendition are not upscaled. """
+        self._upload((100, 50))
+
+        self.assertEqual(set(self.recipe.image_variants['jpg']), {'100'})
+
+    @override_settings(RECIPE_IMAGE_RENDITIONS_ASYNC=False)
+    def test_new_upload_replaces_renditions(self):
+        """ Test uploading again deletes the previous renditions. """
+        self._upload((400, 300))
+        old_names = list(self.recipe.image_variants['webp'].values())
+        old_image = self.recipe.image.name
+
+        self._upload((400, 300))
+
+        for name in old_names:
+            self.assertFalse(default_storage.exists(name))
+        self.assertNotEqual(self.recipe.image_variants['webp'], {})
+        default_storage.delete(old_image)
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_upload_image_too_large(self):
+        """ Test uploads above the size limit are rejected. """
+        res = self._upload((400, 300))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        self.assertFalse(self.recipe.image)
@@ -0,0 +1,180 @@
+"""
+Tests for the recipe full-text search
+"""
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching recipes with the search param"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_title_and_description(self):
+        """Test search matches words of titles and descriptions"""
+        create_recipe(self.user, title='Thai curry')
+        create_recipe(self.user, description='A mild curry for kids')
+        create_recipe(self.user, title='Pancakes')
+
+        titles = self._search('curries')
+
+        self.assertEqual(len(titles), 2)
+        self.assertNotIn('Pancakes', titles)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_ranks_title_first(self):
+        """Test a title match ranks above a description match"""
+        create_recipe(self.user, title='Tomato soup')
+        create_recipe(self.user, title='Soup', description='With tomato')
+        create_recipe(self.user, title='Salad', description='Tomato salad')
+
+        titles = self._search('tomato')
+
+        self.assertEqual(titles[0], 'Tomato soup')
+        self.assertEqual(len(titles), 3)
+
+    def test_search_tag_and_ingredient_names(self):
+        """Test search matches the names of tags and ingredients"""
+        vegan = create_recipe(self.user, title='Bowl')
+        vegan.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        lemon = create_recipe(self.user, title='Tart')
+        lemon.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Lemon')
+        )
+        create_recipe(self.user, title='Stew')
+
+        self.assertEqual(self._search('vegan'), ['Bowl'])
+        self.assertEqual(self._search('lemon'), ['Tart'])
+
+    def test_search_follows_tag_changes(self):
+        """Test renaming or deleting a tag updates the index"""
+        recipe = create_recipe(self.user, title='Bowl')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        tag.name = 'Spicy'
+        tag.save()
+        self.assertEqual(self._search('vegan'), [])
+        self.assertEqual(self._search('spicy'), ['Bowl'])
+
+        tag.delete()
+        self.assertEqual(self._search('spicy'), [])
+
+    def test_search_follows_recipe_update(self):
+        """Test updating a recipe through the API reindexes it"""
+        recipe = create_recipe(self.user, title='Stew')
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        self.client.patch(url, {'title': 'Goulash'})
+
+        self.assertEqual(self._search('goulash'), ['Goulash'])
+        self.assertEqual(self._search('stew'), [])
+
+    def test_search_bulk_imported(self):
+        """Test recipes created by the bulk import are searchable"""
+        body = (
+            b'{"title": "Miso soup", "time_minutes": 5, "price": "2.00",'
+            b' "description": "Quick", "tags": [{"name": "Japanese"}]}\n'
+        )
+        self.client.post(
+            reverse('recipe:recipe-bulk'), body,
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(self._search('japanese'), ['Miso soup'])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the user's recipes"""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(other, title='Curry')
+
+        self.assertEqual(self._search('curry'), [])
+
+    def test_search_pages_by_rank(self):
+        """Test paging through results returns each match once"""
+        for i in range(5):
+            create_recipe(
+                self.user, title=f'Recipe {i}', description='curry ' * i,
+            )
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry', 'page_size': 2})
+        titles = [recipe['title'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            titles += [recipe['title'] for recipe in res.data['results']]
+
+        self.assertEqual(titles, [f'Recipe {i}' for i in range(4, 0, -1)])
+
+    def test_search_pages_through_equal_ranks(self):
+        """Test matches of the same rank are paged newest first"""
+        recipes = [create_recipe(self.user, title='Curry') for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry', 'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_search_fallback_without_postgres(self):
+        """Test search falls back to substring matching"""
+        create_recipe(self.user, title='Thai curry')
+        create_recipe(self.user, title='Pancakes')
+
+        with patch('core.search.is_supported', return_value=False):
+            titles = self._search('curr')
+
+        self.assertEqual(titles, ['Thai curry'])
+
+    def test_search_fallback_matches_each_word(self):
+        """Test the fallback matches the words anywhere, not the phrase"""
+        create_recipe(self.user, title='Green curry', description='Thai')
+        tagged = create_recipe(self.user, title='Red curry')
+        tagged.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        create_recipe(self.user, title='Thai salad')
+
+        with patch('core.search.is_supported', return_value=False):
+            self.assertEqual(self._search('thai curry'), ['Green curry'])
+            self.assertEqual(self._search('curry  spicy'), ['Red curry'])
@@ -1,15 +1,23 @@
+import base64
+import csv
+import io
+import json
 from decimal import Decimal
+from urllib.parse import urlencode
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
+from core.queries import QueryDetectorTestMixin
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
+EXPORT_URL = reverse('recipe:tag-export')
 
 def detail_url(tag_id):
     """Return tag detail URL"""
@@ -29,7 +37,8 @@ class PublicTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateTagsApiTests(TestCase):
+
+class PrivateTagsApiTests(QueryDetectorTestMixin, TestCase):
     def setUp(self):
         self.user = create_user()
         self.client = APIClient()
@@ -45,7 +54,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True) # many=True because we are serializing a list of objects
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_test_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -56,9 +65,9 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
          """Test updating a tag"""
@@ -73,6 +82,31 @@ class PrivateTagsApiTests(TestCase):
 
          self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_to_existing_name_error(self):
+        """Test renaming a tag onto another of the user's tags fails"""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_update_tag_case_only(self):
+        """Test a tag can be renamed to another spelling of its name"""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='vegan')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'DESSERT'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+        self.assertEqual(tag.normalized_name, 'vegan')
+
     def test_delete_tag(self):
         """Test deleting a tag"""
         tag = Tag.objects.create(user=self.user, name='Breakfast')
@@ -100,8 +134,9 @@ class PrivateTagsApiTests(TestCase):
 
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data) # ONLY tag1 is in the response
-        self.assertNotIn(s2.data, res.data)
+        # ONLY tag1 is in the response
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_tags_unique(self):
         """ Test filtered tags returns a unique list. """
@@ -124,3 +159,155 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated_by_name(self):
+        """ Test tags are paged in descending name order. """
+        for name in ['Breakfast', 'Dinner', 'Lunch']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Lunch', 'Dinner'])
+
+        res = self.client.get(res.data['next'])
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Breakfast'])
+
+    def test_assigned_only_invalid(self):
+        """ Test a junk assigned_only value returns a 400. """
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_with_counts(self):
+        """ Test with_counts adds recipe counts in a single query. """
+        cache.clear()
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        Tag.objects.create(user=self.user, name='Dinner')
+        for title in ['Pancakes', 'Porridge']:
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=5,
+                price=Decimal('3.00'),
+            )
+            recipe.tags.add(tag1)
+        recipe.tags.add(tag2)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                TAGS_URL, {'with_counts': 1, 'assigned_only': 1},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': tag2.id, 'name': 'Lunch', 'recipe_count': 1},
+            {'id': tag1.id, 'name': 'Breakfast', 'recipe_count': 2},
+        ])
+
+    def test_tags_without_counts(self):
+        """ Test counts are only returned when asked for. """
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('recipe_count', res.data['results'][0])
+
+    def test_tags_ordered_by_usage(self):
+        """ Test ordering=-recipe_count lists the most used tags first. """
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Breakfast', 'Lunch', 'Dinner']
+        ]
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=5,
+            price=Decimal('3.00'),
+        )
+        recipe.tags.add(tags[1])
+
+        res = self.client.get(
+            TAGS_URL, {'ordering': '-recipe_count', 'page_size': 2},
+        )
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [tag['name'] for tag in res.data['results']]
+
+        # Ties newest first
+        self.assertEqual(names, ['Lunch', 'Dinner', 'Breakfast'])
+
+    def test_usage_ordering_pages_by_position(self):
+        """ Test pages of tied counts start after the last tag seen. """
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+        res = self.client.get(
+            TAGS_URL, {'ordering': '-recipe_count', 'page_size': 2},
+        )
+
+        # Sorts before the page read, an offset would repeat Tag 3
+        Tag.objects.create(user=self.user, name='New')
+        res = self.client.get(res.data['next'])
+        ids = [tag['id'] for tag in res.data['results']]
+        self.assertEqual(ids, [tags[2].id, tags[1].id])
+
+        res = self.client.get(res.data['previous'])
+        ids = [tag['id'] for tag in res.data['results']]
+        self.assertEqual(ids, [tags[4].id, tags[3].id])
+
+    def test_invalid_cursor(self):
+        """ Test cursors with positions not matching the ordering 404. """
+        for position in ['x', '["x"]', '["x", "y"]']:
+            cursor = base64.b64encode(urlencode({'p': position}).encode())
+            res = self.client.get(TAGS_URL, {'cursor': cursor.decode()})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_tags_ndjson(self):
+        """ Test exporting tags streams one JSON object per line. """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        unused = Tag.objects.create(user=self.user, name='Dessert')
+        Tag.objects.create(user=create_user(email='o@example.com'), name='X')
+        Recipe.objects.create(
+            user=self.user,
+            title='Cake',
+            time_minutes=5,
+            price=Decimal('3.00'),
+        ).tags.add(tag)
+
+        res = self.client.get(EXPORT_URL, {'with_counts': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'id': tag.id, 'name': 'Vegan', 'recipe_count': 1},
+            {'id': unused.id, 'name': 'Dessert', 'recipe_count': 0},
+        ])
+
+    def test_export_tags_csv(self):
+        """ Test exporting tags as CSV with a header row. """
+        tag = Tag.objects.create(user=self.user, name='Comfort, "Food"')
+
+        res = self.client.get(
+            EXPORT_URL, {'export_format': 'csv', 'assigned_only': 0},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertIn('tags.csv', res['Content-Disposition'])
+        content = b''.join(res.streaming_content).decode()
+        self.assertEqual(list(csv.reader(io.StringIO(content))), [
+            ['id', 'name'], [str(tag.id), 'Comfort, "Food"'],
+        ])
+
+    def test_export_tags_invalid_format(self):
+        """ Test an unknown export format is rejected. """
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -8,14 +8,43 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
 )
-from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from rest_framework import viewsets, mixins, status, exceptions
 from rest_framework.permissions import IsAuthenticated
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from core.models import Recipe, Tag, Ingredient
-from recipe import serializers
+from core.search import search_recipes
+from user.authentication import CachedTokenAuthentication
+from recipe import batch, bulk, filters, images, serializers
+from recipe.caching import CachedListMixin, bump_generation
+from recipe.listing import ValuesListMixin
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+
+# Response shaping of the recipe list and detail
+FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of the fields to return',
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='Comma separated list of detail fields to add to the '
+                    'default ones, e.g. description',
+    ),
+]
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -30,40 +59,181 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
-        ]
-    )
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=list(filters.MATCH_CHOICES),
+                description='Return recipes with any (default) or all of '
+                            'the tags and ingredients filtered by',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full-text search of titles, descriptions, '
+                            'tags and ingredients, best matches first',
+            ),
+        ] + FIELDS_PARAMETERS
+    ),
+    retrieve=extend_schema(parameters=FIELDS_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin,
+                    ValuesListMixin,
+                    viewsets.ModelViewSet):
     """View for manage recipe APIs."""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all() # represents the objects that are available for the viewset
-    authentication_classes = [TokenAuthentication,]
+    authentication_classes = [CachedTokenAuthentication,]
     permission_classes = [IsAuthenticated,]
+    pagination_class = RecipeCursorPagination
+    cache_normalized_params = ('tags', 'ingredients')
+
+    # Actions whose querysets are shaped to the serializer that reads them
+    optimized_actions = ('list', 'retrieve')
+
+    def _get_requested_fields(self):
+        """Return the fields asked for with fields= and expand=, or None.
+
+        fields= picks any of the detail fields, expand= adds detail fields
+        to the action's default ones.
+        """
+        params = self.request.query_params
+        if self.action not in self.optimized_actions or not (
+            'fields' in params or 'expand' in params
+        ):
+            return None
+
+        available = serializers.RecipeDetailSerializer.Meta.fields
+        if 'fields' in params:
+            requested = filters.parse_names(
+                params['fields'], 'fields', available,
+            )
+        elif self.action == 'list':
+            requested = set(serializers.RecipeSerializer.Meta.fields)
+        else:
+            requested = set(available)
+        if 'expand' in params:
+            requested |= filters.parse_names(
+                params['expand'], 'expand', available,
+            )
 
-    def _params_to_ints(self, qs):
-        """ Convert a list of strings to integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        return [name for name in available if name in requested]
+
+    def _get_read_plan(self):
+        """Return the columns and prefetches the serializer reads."""
+        model_fields = {
+            field.name: field for field in Recipe._meta.get_fields()
+        }
+        columns = []
+        prefetches = []
+        fields = self._get_requested_fields()
+        if fields is None:
+            fields = self.get_serializer_class().Meta.fields
+        for name in fields:
+            field = model_fields.get(name)
+            if field is None:
+                continue
+            if field.many_to_many:
+                # Nested serializers only render id and name
+                prefetches.append(Prefetch(
+                    name,
+                    queryset=field.related_model.objects.only(
+                        'id', 'name',
+                    ).order_by('id'),
+                ))
+            elif field.concrete:
+                columns.append(name)
+
+        return columns, prefetches
+
+    def _optimize_queryset(self, queryset):
+        """Load only the columns and relations the serializer reads."""
+        if self.action not in self.optimized_actions:
+            return queryset
+
+        columns, prefetches = self._get_read_plan()
+        return queryset.only(*columns).prefetch_related(*prefetches)
 
     # 自定义获取查询集
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user."""
         #return self.queryset.filter(user=self.request.user).order_by('-id')
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
+        match = filters.parse_match(params.get('match'))
+        search = params.get('search', '').strip()
         queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        return queryset.filter(
+        for field_name in ('tags', 'ingredients'):
+            if params.get(field_name):
+                ids = filters.parse_ids(params[field_name], field_name)
+                queryset = filters.filter_by_related(
+                    queryset, field_name, ids, match,
+                )
+
+        queryset = queryset.filter(
             user = self.request.user
-        ).order_by('-id').distinct()
+        ).order_by('-id')
+        if search:
+            # Ranked, the pagination then orders by rank
+            queryset = search_recipes(queryset, search)
+
+        return self._optimize_queryset(queryset)
+
+    def get_list_validators(self, digest):
+        """Derive the list's ETag from one aggregate.
+
+        No Last-Modified: deleting a recipe doesn't move max(updated_at),
+        so If-Modified-Since alone would get a stale 304.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        stats = queryset.aggregate(
+            count=Count('id'), last_modified=Max('updated_at'),
+        )
+        last_modified = stats['last_modified']
+        # A deletion lowers the count, any other write moves updated_at
+        etag = 'W/"%s-%s-%s"' % (
+            digest,
+            stats['count'],
+            last_modified.timestamp() if last_modified else 0,
+        )
+        return etag, None
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the recipe, or 304 if the client's copy is current."""
+        try:
+            updated_at = Recipe.objects.filter(
+                user=request.user, pk=kwargs['pk'],
+            ).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):  # not an id
+            updated_at = None
+        if updated_at is None:  # let the regular path return the 404
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = 'W/"%s-%s"' % (kwargs['pk'], updated_at.timestamp())
+        fields = self._get_requested_fields()
+        if fields is not None:  # another representation, another ETag
+            etag = '%s-%s"' % (etag[:-1], ','.join(fields))
+        last_modified = int(updated_at.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+        )
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, trimmed to the requested fields."""
+        fields = self._get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         """Return the serilizer class for requests."""
+        if self._get_requested_fields() is not None:
+            # Has every field, trimmed by get_serializer
+            return serializers.RecipeDetailSerializer
         if self.action == 'list':
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':  # custome action
@@ -78,56 +248,223 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(methods=['POST'], detail=True, url_path='upload-image') # custome action
     def upload_image(self, request, pk=None):
         """ Upload an image to a recipe."""
+        # Refuse oversized uploads before reading the body
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_length > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+            return Response(
+                {'image': ['Image file too large.']},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
         recipe = self.get_object()
+        old_variants = recipe.image_variants
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(image_variants={})
+            images.delete_renditions(old_variants)
+            # Resizing runs in a background worker, not this request
+            images.schedule_renditions(recipe.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        methods=['POST'], detail=False, url_path='bulk', url_name='bulk',
+    )
+    def bulk_import(self, request):
+        """ Create recipes from an NDJSON body, one recipe per line."""
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type != bulk.NDJSON_CONTENT_TYPE:
+            raise exceptions.UnsupportedMediaType(content_type)
+        if request.stream is None:
+            raise exceptions.ParseError('Request body is empty.')
+
+        # Read the body line by line instead of parsing it all at once
+        created, errors = bulk.import_recipes(
+            request.stream,
+            request.user,
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+        )
+        # bulk_create skips the signals that invalidate cached lists
+        bump_generation(request.user.id)
+
+        return Response(
+            {'created': created, 'errors': errors},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """ Stream the user's recipes as NDJSON, one recipe per line."""
+        columns, prefetches = self._get_read_plan()
+        queryset = self.filter_queryset(self.get_queryset()).only(*columns)
+
+        return StreamingHttpResponse(
+            bulk.export_recipes(
+                queryset,
+                prefetches,
+                self.get_serializer_class(),
+                self.get_serializer_context(),
+            ),
+            content_type=bulk.NDJSON_CONTENT_TYPE,
+        )
+
+
+# Filters of tag and ingredient lists and exports
+ATTR_LIST_PARAMETERS = [
+    OpenApiParameter(
+        'assigned_only',
+        OpenApiTypes.INT, enum=[0, 1],
+        description='Filter by items assigned to recipes',
+    ),
+    OpenApiParameter(
+        'with_counts',
+        OpenApiTypes.INT, enum=[0, 1],
+        description='Include the number of recipes using each item',
+    ),
+    OpenApiParameter(
+        'ordering',
+        OpenApiTypes.STR,
+        enum=['name', '-name', 'recipe_count', '-recipe_count'],
+        description='Order by name (default -name) or by usage',
+    ),
+]
+
+
 @extend_schema_view(
-    list=extend_schema(
+    list=extend_schema(parameters=ATTR_LIST_PARAMETERS),
+    export=extend_schema(
         parameters=[
             OpenApiParameter(
-                'assigned_only',
-                OpenApiTypes.INT, enum=[0, 1],
-                description='Filter by items assigned to recipes',
+                'export_format',
+                OpenApiTypes.STR, enum=list(bulk.EXPORT_FORMATS),
+                description='Output format, ndjson (default) or csv',
             ),
-        ]
-    )
+        ] + ATTR_LIST_PARAMETERS,
+    ),
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication,]
+    authentication_classes = [CachedTokenAuthentication,]
     permission_classes = [IsAuthenticated,]
+    pagination_class = RecipeAttrCursorPagination
+    filter_backends = [filters.TieBreakOrderingFilter]
+    ordering_fields = ['name', 'recipe_count']
+    ordering = ['-name']
+
+    # Recipe field linking to the items, and the serializer for with_counts
+    recipe_field = None
+    count_serializer_class = None
+
+    def _with_counts(self):
+        return self.action in ('list', 'export') and filters.parse_flag(
+            self.request.query_params.get('with_counts'), 'with_counts',
+        )
 
     def get_queryset(self):
         """ Filtering queryset to authenticated user. """
+        assigned_only = filters.parse_flag(
+            self.request.query_params.get('assigned_only'), 'assigned_only',
+        )
 
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        ) # default value is 0, this is for the case when assigned_only is not provided
-
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            # A semi-join, items are not repeated per recipe
+            queryset = filters.filter_assigned(queryset, self.recipe_field)
 
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+        return queryset.order_by('-name')
 
+    def get_serializer_class(self):
+        """Return the serializer class for requests."""
+        if self._with_counts():
+            return self.count_serializer_class
+        return self.serializer_class
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """ Stream all the user's items as NDJSON or CSV."""
+        export_format = request.query_params.get('export_format') or 'ndjson'
+        if export_format not in bulk.EXPORT_FORMATS:
+            raise exceptions.ValidationError({'export_format': [
+                f'Expected one of: {", ".join(bulk.EXPORT_FORMATS)}.'
+            ]})
+
+        response = StreamingHttpResponse(
+            bulk.export_rows(
+                self.filter_queryset(self.get_queryset()),
+                self.get_serializer_class().Meta.fields,
+                export_format,
+            ),
+            content_type=bulk.EXPORT_FORMATS[export_format],
+        )
+        name = self.queryset.model._meta.verbose_name_plural
+        response['Content-Disposition'] = (
+            f'attachment; filename="{name}.{export_format}"'
+        )
+        return response
+
+    @extend_schema(
+        methods=['PATCH'],
+        request=serializers.BatchRenameSerializer(many=True),
+    )
+    @extend_schema(
+        methods=['DELETE'],
+        request=serializers.BatchDeleteSerializer,
+    )
+    @action(
+        methods=['PATCH', 'DELETE'], detail=False,
+        url_path='bulk', url_name='bulk',
+    )
+    def bulk(self, request):
+        """ Rename or delete many items in one statement."""
+        model = self.queryset.model
+        if request.method == 'DELETE':
+            serializer = serializers.BatchDeleteSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            deleted = batch.delete_items(
+                model, request.user, set(serializer.validated_data['ids']),
+            )
+            return Response({'deleted': deleted})
+
+        serializer = serializers.BatchRenameSerializer(
+            data=request.data, many=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        objects = batch.rename_items(model, request.user, {
+            item['id']: item['name'] for item in serializer.validated_data
+        })
+        return Response(self.get_serializer(objects, many=True).data)
+
+    @extend_schema(request=serializers.MergeSerializer)
+    @action(methods=['POST'], detail=True, url_path='merge')
+    def merge(self, request, pk=None):
+        """ Move the recipes of other items to this one and delete them."""
+        serializer = serializers.MergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = batch.merge_items(
+            self.queryset.model,
+            self.get_object(),
+            set(serializer.validated_data['sources']),
+        )
+        return Response(self.count_serializer_class(target).data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """ Manage tags in the database."""
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagWithCountSerializer
     queryset = Tag.objects.all()
+    recipe_field = 'tags'
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """ Manage ingredients in the database. """
     serializer_class = serializers.IngredientSerializer
+    count_serializer_class = serializers.IngredientWithCountSerializer
     queryset = Ingredient.objects.all()
-
+    recipe_field = 'ingredients'
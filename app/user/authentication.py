@@ -0,0 +1,150 @@
+"""
+Authentication for the APIs
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# v2: entries hold AUTH_USER_FIELDS, not the pickled user and token
+CACHE_KEY_PREFIX = 'auth:token:v2:'
+
+# The user fields kept in the caches, the others load when accessed
+AUTH_USER_FIELDS = ('id', 'is_active', 'is_staff', 'is_superuser')
+
+
+class LocalTTLCache:
+    """Thread safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Cache value for key, evicting the least recently used entry"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_token_cache = LocalTTLCache(
+    maxsize=settings.TOKEN_AUTH_LOCAL_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_LOCAL_CACHE_TTL,
+)
+
+
+def invalidate_token(key):
+    """Drop a token from the process-local cache and Django's cache"""
+    local_token_cache.delete(key)
+    cache.delete(CACHE_KEY_PREFIX + key)
+
+
+def _cache_entry(user):
+    return tuple(getattr(user, field) for field in AUTH_USER_FIELDS)
+
+
+def _from_cache_entry(key, entry):
+    """Return the (user, token) of a cache entry, on a fresh user object"""
+    user = get_user_model().from_db(DEFAULT_DB_ALIAS, AUTH_USER_FIELDS, entry)
+    return user, Token(key=key, user=user)
+
+
+def issue_token(user):
+    """Return the key of the user's token, created if missing.
+
+    On PostgreSQL the lookup and the insert are a single statement, where
+    Token.objects.get_or_create runs a select, then an insert in a
+    savepoint.
+    """
+    if connection.vendor != 'postgresql':
+        return Token.objects.get_or_create(user=user)[0].key
+
+    table = connection.ops.quote_name(Token._meta.db_table)
+    key = connection.ops.quote_name('key')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH inserted AS ('
+            f'INSERT INTO {table} ({key}, user_id, created) '
+            f'VALUES (%s, %s, %s) ON CONFLICT (user_id) DO NOTHING '
+            f'RETURNING {key}) '
+            f'SELECT {key} FROM inserted UNION ALL '
+            f'SELECT {key} FROM {table} WHERE user_id = %s LIMIT 1',
+            [Token.generate_key(), user.pk, timezone.now(), user.pk],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        # A concurrent login created the token after this statement started
+        return Token.objects.get(user=user).key
+    return row[0]
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication which caches the token -> user lookup.
+
+    Checks a short lived in-process LRU first, then Django's cache, and
+    only queries the database on a miss in both. Only the user's id and
+    AUTH_USER_FIELDS flags are cached, never the password hash: the
+    returned user loads its other fields from the database when accessed.
+
+    Deleting the token or saving its user drops the entry from this
+    process and from Django's cache. Other processes only see that when
+    Django's cache is shared between them, as the memcached configured by
+    settings_production is, and still keep their local copy for up to
+    TOKEN_AUTH_LOCAL_CACHE_TTL seconds. With the default LocMemCache every
+    process has its own cache, so changes made by another process take
+    effect after TOKEN_AUTH_CACHE_TTL. Bulk writes such as
+    queryset.update(is_active=False) send no signal, so they take effect
+    after TOKEN_AUTH_CACHE_TTL unless the user's tokens are invalidated
+    too.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = local_token_cache.get(key)
+        if entry is not None:
+            return _from_cache_entry(key, entry)
+
+        entry = cache.get(CACHE_KEY_PREFIX + key)
+        if entry is None:
+            # Raises AuthenticationFailed for unknown keys and inactive users
+            user, token = super().authenticate_credentials(key)
+            entry = _cache_entry(user)
+            cache.set(
+                CACHE_KEY_PREFIX + key, entry, settings.TOKEN_AUTH_CACHE_TTL,
+            )
+            local_token_cache.set(key, entry)
+            return user, token
+
+        local_token_cache.set(key, entry)
+        return _from_cache_entry(key, entry)
@@ -0,0 +1,21 @@
+"""
+Password hashers with their cost taken from the settings
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id with the PASSWORD_ARGON2_* parameters.
+
+    Hashes made with other parameters are still verified, and rehashed
+    with these ones on the next successful login.
+    """
+    time_cost = settings.PASSWORD_ARGON2_TIME_COST
+    memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST
+    parallelism = settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with PASSWORD_BCRYPT_ROUNDS, rehashed on login when changed"""
+    rounds = settings.PASSWORD_BCRYPT_ROUNDS
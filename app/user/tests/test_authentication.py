@@ -0,0 +1,131 @@
+"""
+Tests for the cached token authentication
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from user.authentication import (
+    CACHE_KEY_PREFIX,
+    CachedTokenAuthentication,
+    LocalTTLCache,
+    local_token_cache,
+)
+
+ME_URL = reverse('user:me')
+
+
+class LocalTTLCacheTests(TestCase):
+    """Test the process-local LRU cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when full"""
+        lru = LocalTTLCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_entries_expire(self):
+        """Test entries are not returned after their ttl"""
+        lru = LocalTTLCache(maxsize=2, ttl=-1)
+        lru.set('a', 1)
+
+        self.assertIsNone(lru.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and invalidated"""
+
+    def setUp(self):
+        local_token_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.auth = CachedTokenAuthentication()
+
+    def test_lookup_cached(self):
+        """Test only the first lookup of a token queries the database"""
+        with self.assertNumQueries(1):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            cached_user, _ = self.auth.authenticate_credentials(
+                self.token.key
+            )
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(cached_user, self.user)
+
+    def test_shared_cache_used_when_local_misses(self):
+        """Test a lookup cached by another process avoids the database"""
+        self.auth.authenticate_credentials(self.token.key)
+        local_token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+
+    def test_password_hash_not_cached(self):
+        """Test only the id and flags of the user are cached"""
+        self.auth.authenticate_credentials(self.token.key)
+        local_token_cache.clear()
+
+        entry = cache.get(CACHE_KEY_PREFIX + self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertNotIn(self.user.password, repr(entry))
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.is_active)
+        self.assertEqual(token.key, self.token.key)
+        with self.assertNumQueries(1):  # loaded when accessed
+            self.assertEqual(user.email, self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating"""
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user's token stops authenticating"""
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_refreshes_cached_user(self):
+        """Test updating the profile is visible on the next request"""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'name': 'Updated Name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        local_token_cache.clear()  # as if served by another process
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated Name')
@@ -0,0 +1,173 @@
+"""
+Tests for password hashing, login throttling and token issue
+"""
+import json
+from importlib.util import find_spec
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    check_password,
+    get_hasher,
+    make_password,
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import issue_token
+from user.hashers import Argon2PasswordHasher
+
+TOKEN_URL = reverse('user:token')
+
+
+def create_user(email='test@example.com', password='testpass'):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class IssueTokenTests(TestCase):
+    """Test tokens are issued in a single query"""
+
+    @skipUnless(
+        connection.vendor == 'postgresql', 'Uses INSERT ... ON CONFLICT',
+    )
+    def test_creates_then_returns_token(self):
+        """Test the first call creates the token, the next return it"""
+        user = create_user()
+
+        with self.assertNumQueries(1):
+            key = issue_token(user)
+        with self.assertNumQueries(1):
+            self.assertEqual(issue_token(user), key)
+
+        self.assertEqual(Token.objects.get(user=user).key, key)
+
+    def test_returns_existing_token(self):
+        """Test the key of an existing token is returned"""
+        token = Token.objects.create(user=create_user())
+
+        self.assertEqual(issue_token(token.user), token.key)
+
+
+class PasswordHashingTests(TestCase):
+    """Test password hashes are upgraded on login"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_weaker_hash_upgraded_on_login(self):
+        """Test a hash with fewer iterations is replaced after login"""
+        user = create_user()
+        user.password = PBKDF2PasswordHasher().encode(
+            'testpass', 'somesalt', iterations=1000,
+        )
+        user.save()
+
+        res = self.client.post(
+            TOKEN_URL, {'email': user.email, 'password': 'testpass'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertEqual(
+            get_hasher().safe_summary(user.password)['algorithm'],
+            get_hasher().algorithm,
+        )
+        self.assertFalse(get_hasher().must_update(user.password))
+        self.assertTrue(check_password('testpass', user.password))
+
+    @skipUnless(find_spec('argon2'), 'argon2-cffi is not installed')
+    def test_argon2_parameters(self):
+        """Test argon2 hashes use the configured cost"""
+        with override_settings(PASSWORD_HASHERS=[
+            'user.hashers.Argon2PasswordHasher',
+        ]):
+            encoded = make_password('testpass')
+
+        summary = Argon2PasswordHasher().safe_summary(encoded)
+        self.assertEqual(
+            int(summary['memory cost']), Argon2PasswordHasher.memory_cost,
+        )
+        self.assertEqual(
+            int(summary['time cost']), Argon2PasswordHasher.time_cost,
+        )
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': '5/min', 'email': '2/min'})
+class LoginThrottleTests(TestCase):
+    """Test login attempts are limited before checking passwords"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_user()
+
+    def login(self, email='test@example.com', password='testpass', **extra):
+        return self.client.post(
+            TOKEN_URL, {'email': email, 'password': password}, **extra,
+        )
+
+    def test_email_limit(self):
+        """Test attempts past the email rate are refused, even correct ones"""
+        self.assertEqual(
+            self.login(password='wrong').status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        res = self.login(email=' Test@Example.com')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(
+            self.login(email='other@example.com').status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_ip_limit(self):
+        """Test attempts past the client IP rate are refused"""
+        for number in range(5):
+            self.login(email=f'user{number}@example.com')
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(
+            self.login(REMOTE_ADDR='10.0.0.2').status_code,
+            status.HTTP_200_OK,
+        )
+
+    @override_settings(
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1},
+    )
+    def test_ip_limit_ignores_spoofed_forwarded_for(self):
+        """Test addresses added by the client to X-Forwarded-For are ignored"""
+        for number in range(6):
+            res = self.login(
+                email=f'user{number}@example.com',
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{number}, 172.18.0.5',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_non_object_body(self):
+        """Test a body which is not an object is a bad request"""
+        res = self.client.post(
+            TOKEN_URL, json.dumps([1, 2]), content_type='application/json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(LOGIN_THROTTLE_RATES={})
+    def test_disabled(self):
+        """Test no attempt is refused without rates"""
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
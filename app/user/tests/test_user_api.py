@@ -9,6 +9,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.queries import QueryDetectorTestMixin
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -18,7 +20,8 @@ def create_user(**params):
     """Create and return a new user"""
     return get_user_model().objects.create_user(**params)
 
-class PublicUserApiTests(TestCase):
+
+class PublicUserApiTests(QueryDetectorTestMixin, TestCase):
     """Test the public features of the users API"""
 
     def setUp(self):
@@ -108,7 +111,8 @@ class PublicUserApiTests(TestCase):
         res = self.client.get(ME_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateUserApiTests(TestCase):
+
+class PrivateUserApiTests(QueryDetectorTestMixin, TestCase):
     """Test api requests that require authentication"""
 
     def setUp(self):
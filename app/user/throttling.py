@@ -0,0 +1,77 @@
+"""
+Throttling of the login endpoint
+"""
+import hashlib
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+CACHE_KEY_PREFIX = 'throttle:login:'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return (requests, seconds) of a rate like '10/min'"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class LoginRateThrottle(BaseThrottle):
+    """Limit login attempts per client IP and per email.
+
+    Runs before the password is hashed, so floods are refused cheaply.
+    Attempts are counted in fixed windows with one cache increment per
+    scope, in Django's cache: shared between processes when it is
+    memcached, per process with the default local memory cache. The rates
+    are set by LOGIN_THROTTLE_RATES, a missing or None rate disables the
+    scope.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scopes(self, request):
+        """Return [(scope, identifier)] of the request.
+
+        The client IP comes from get_ident(), so NUM_PROXIES must count the
+        proxies in front of the app for X-Forwarded-For to be trusted.
+        """
+        # Other bodies are rejected by the serializer after the throttle
+        data = request.data
+        email = data.get('email') if isinstance(data, Mapping) else None
+        return [
+            ('ip', self.get_ident(request)),
+            ('email', email.strip().lower() if isinstance(email, str) else ''),
+        ]
+
+    def allow_request(self, request, view):
+        rates = settings.LOGIN_THROTTLE_RATES
+        now = time.time()
+        for scope, ident in self.get_scopes(request):
+            if not ident or not rates.get(scope):
+                continue
+            limit, period = parse_rate(rates[scope])
+            key = '{}{}:{}:{}'.format(
+                CACHE_KEY_PREFIX, scope, int(now // period),
+                hashlib.sha256(ident.encode()).hexdigest(),
+            )
+            if self._increment(key, period) > limit:
+                self.wait_seconds = period - now % period
+                return False
+        return True
+
+    def _increment(self, key, timeout):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # First attempt of the window, unless another request won
+            if cache.add(key, 1, timeout):
+                return 1
+            return cache.incr(key)
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,11 +1,15 @@
 """
 Views for the user API
 """
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from user.authentication import CachedTokenAuthentication, issue_token
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.throttling import LoginRateThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -16,13 +20,23 @@ class createTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer  # use our custom user model
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES  # use the default renderer classes
+    throttle_classes = (LoginRateThrottle,)
+
+    def post(self, request, *args, **kwargs):
+        """Return the token of the user, issued in a single query"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            'token': issue_token(serializer.validated_data['user']),
+        })
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authentication user"""
-        return self.request.user  # return the user that is currently authenticated
\ No newline at end of file
+        # The authenticated user only has the fields cached for auth
+        return get_user_model().objects.get(pk=self.request.user.pk)
@@ -0,0 +1,34 @@
+server {
+    listen ${LISTEN_PORT};
+
+    # Static and media files are served straight from the shared volume,
+    # never by Django
+    location /static/static {
+        alias /vol/static/static;
+        expires 30d;
+        access_log off;
+    }
+
+    location /static/media {
+        alias /vol/static/media;
+        expires 7d;
+        access_log off;
+    }
+
+    # Metrics are scraped from the app container, not through the proxy
+    location = /metrics {
+        return 404;
+    }
+
+    location / {
+        proxy_pass              http://${APP_HOST}:${APP_PORT};
+        proxy_set_header        Host $host;
+        proxy_set_header        X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header        X-Forwarded-Proto $scheme;
+        proxy_http_version      1.1;
+        proxy_set_header        Connection "";
+        # Above the app's 10 MiB image limit plus multipart overhead, so
+        # oversized uploads get the app's error rather than nginx's 413
+        client_max_body_size    12M;
+    }
+}
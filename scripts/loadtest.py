@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Small load test for comparing serving configurations.
+
+Hits one API endpoint with a number of concurrent keep-alive clients and
+reports throughput and latency percentiles, e.g.
+
+    python scripts/loadtest.py http://localhost/api/recipe/recipes/ \
+        --token <token> --concurrency 32 --duration 30
+
+Run it against each profile (SERVER=wsgi / SERVER=asgi, different
+GUNICORN_WORKERS / GUNICORN_THREADS, DB_CONN_MAX_AGE=0 vs 600) and compare.
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def worker(url, headers, deadline, latencies, errors, lock):
+    parts = urlsplit(url)
+    connection_class = (
+        http.client.HTTPSConnection if parts.scheme == 'https'
+        else http.client.HTTPConnection
+    )
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    conn = connection_class(parts.netloc, timeout=30)
+    local_latencies = []
+    local_errors = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            res = conn.getresponse()
+            res.read()
+            if res.status >= 400:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = connection_class(parts.netloc, timeout=30)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('url')
+    parser.add_argument('--token', help='API token to authenticate with')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    headers = {'Accept': 'application/json'}
+    if args.token:
+        headers['Authorization'] = f'Token {args.token}'
+
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(args.url, headers, deadline, latencies, errors, lock),
+        )
+        for _ in range(args.concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    if not latencies:
+        print('No successful requests')
+        return
+    latencies.sort()
+    print(f'requests:   {len(latencies)} ({sum(errors)} errors)')
+    print(f'throughput: {len(latencies) / elapsed:.1f} req/s')
+    print(f'mean:       {statistics.mean(latencies) * 1000:.1f} ms')
+    for label, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+        value = percentile(latencies, fraction) * 1000
+        print(f'{label}:        {value:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+#!/bin/sh
+
+# Production entrypoint, run by the app container of docker-compose-deploy.yml
+set -e
+
+python manage.py wait_for_db
+python manage.py collectstatic --noinput
+python manage.py migrate
+
+if [ "$SERVER" = "asgi" ]; then
+    exec gunicorn app.asgi:application -c gunicorn.conf.py \
+        -k uvicorn.workers.UvicornWorker
+else
+    exec gunicorn app.wsgi:application -c gunicorn.conf.py
+fi